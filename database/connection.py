@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+FoodieBot MongoDB Connection Helper
+Shared .env-based connection for CLI tools and background services
+"""
+
+import os
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+
+def get_database():
+    """Connect to MongoDB using the .env configuration"""
+    load_dotenv()
+    uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
+    password = os.getenv('MONGODB_PASSWORD')
+    if password and '<password>' in uri:
+        uri = uri.replace('<password>', password)
+    client = MongoClient(uri)
+    return client[os.getenv('MONGODB_DATABASE', 'foodiebot')]
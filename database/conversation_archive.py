@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+🗄️ FoodieBot Conversation Archive
+Time-bucketed, compressed conversation storage with a TTL archive tier
+
+Features:
+- One document per conversation per N messages (bucket pattern)
+- Full buckets are sealed: their messages are zlib-compressed together into one payload;
+  interest scores stay uncompressed for analytics
+- Cold conversations move to an archive collection that expires via a TTL index
+- A message for an archived conversation moves it back to the hot tier
+- Reads transparently span the hot and archive tiers
+- Streaming migration from the legacy one-document-per-message collection
+
+Usage:
+  python -m database.conversation_archive migrate   # copy legacy messages into buckets
+  python -m database.conversation_archive archive   # move cold conversations to the archive tier
+  python -m database.conversation_archive stats     # storage and index sizes per tier
+"""
+
+import argparse
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from bson import Binary, json_util
+from pymongo import ASCENDING, DESCENDING, DeleteOne, ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+HOT_COLLECTION = 'conversation_buckets'
+ARCHIVE_COLLECTION = 'conversation_archive'
+
+# Legacy messages index that lets migrate_legacy stream in order instead of sorting in memory
+LEGACY_ORDER = [('conversation_id', ASCENDING), ('timestamp', ASCENDING), ('_id', ASCENDING)]
+LEGACY_ORDER_INDEX = 'conversation_timestamp_id'
+
+
+def compress_messages(messages):
+    """Serialize and compress a bucket's messages together (datetimes survive the round trip)"""
+    payload = json_util.dumps(messages, separators=(',', ':')).encode('utf-8')
+    return Binary(zlib.compress(payload, 6))
+
+
+def decompress_messages(blob):
+    """Inverse of compress_messages"""
+    return json_util.loads(zlib.decompress(bytes(blob)).decode('utf-8'))
+
+
+def decompress_message(blob):
+    """Decode one per-message blob written by earlier versions of this module"""
+    return json.loads(zlib.decompress(bytes(blob)).decode('utf-8'))
+
+
+def bucket_messages(bucket):
+    """Messages of one bucket document, sealed or open"""
+    messages = []
+    if bucket.get('payload') is not None:
+        messages.extend(decompress_messages(bucket['payload']))
+    for item in bucket.get('messages', []):
+        messages.append(decompress_message(item) if isinstance(item, (bytes, Binary)) else item)
+    return messages
+
+
+def _utc(value):
+    """Timezone-aware UTC datetime for a message timestamp
+
+    Naive datetimes are taken to be UTC, so writers should use datetime.now(timezone.utc).
+    """
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc)
+
+
+class ConversationArchive:
+    """Bucketed conversation store over a hot and an archive collection"""
+
+    def __init__(self, db, bucket_size=50, archive_after_days=14, retention_days=365):
+        self.db = db
+        self.hot = db[HOT_COLLECTION]
+        self.archive = db[ARCHIVE_COLLECTION]
+        self.bucket_size = bucket_size
+        self.archive_after = timedelta(days=archive_after_days)
+        self.retention = timedelta(days=retention_days)
+
+    @classmethod
+    def from_env(cls, db=None):
+        """Archive configured from the environment"""
+        if db is None:
+            from database.connection import get_database
+            db = get_database()
+        return cls(
+            db,
+            bucket_size=int(os.getenv('CONVERSATION_BUCKET_SIZE', '50')),
+            archive_after_days=float(os.getenv('CONVERSATION_ARCHIVE_AFTER_DAYS', '14')),
+            retention_days=float(os.getenv('CONVERSATION_RETENTION_DAYS', '365')),
+        )
+
+    def ensure_indexes(self):
+        """Create the bucket lookup, cold-scan and TTL indexes"""
+        for collection in (self.hot, self.archive):
+            collection.create_index([('conversation_id', ASCENDING), ('bucket', ASCENDING)],
+                                    unique=True, name='conversation_bucket')
+        self.hot.create_index([('last_message_at', ASCENDING)], name='last_message_at')
+        self.archive.create_index([('expire_at', ASCENDING)], expireAfterSeconds=0, name='ttl_expire_at')
+
+    def append_message(self, conversation_id, message):
+        """Append a message to the conversation's open bucket, opening a new one when full"""
+        timestamp = _utc(message.get('timestamp'))
+        message = dict(message, timestamp=timestamp)
+        score = message.get('interest_score')
+        update = {
+            '$push': {'messages': message},
+            '$inc': {'count': 1},
+            '$min': {'first_message_at': timestamp},
+            '$max': {'last_message_at': timestamp},
+        }
+        if message.get('sender') == 'user' and isinstance(score, (int, float)):
+            update['$push']['interest_scores'] = float(score)
+            update['$max']['max_interest_score'] = float(score)
+
+        for _ in range(3):
+            latest = self.hot.find_one({'conversation_id': conversation_id},
+                                       {'bucket': 1, 'count': 1}, sort=[('bucket', DESCENDING)])
+            if latest is None and self._restore_archived(conversation_id):
+                continue  # conversation came back from the archive; number after its buckets
+            if latest and latest['count'] < self.bucket_size:
+                updated = self.hot.find_one_and_update(
+                    {'_id': latest['_id'], 'count': {'$lt': self.bucket_size}}, update,
+                    projection={'count': 1}, return_document=ReturnDocument.AFTER
+                )
+                if updated is not None:
+                    if updated['count'] >= self.bucket_size:
+                        self._seal(updated['_id'])
+                    return latest['bucket']
+                continue  # bucket filled concurrently; look again
+
+            bucket = latest['bucket'] + 1 if latest else 0
+            try:
+                # A full bucket with this number fails the count filter, so the
+                # upsert collides on the unique index instead of overfilling it
+                self.hot.update_one(
+                    {'conversation_id': conversation_id, 'bucket': bucket, 'count': {'$lt': self.bucket_size}},
+                    update,
+                    upsert=True
+                )
+                return bucket
+            except DuplicateKeyError:
+                continue  # another writer opened this bucket first
+        raise RuntimeError(f"Could not append message to conversation {conversation_id}")
+
+    def _seal(self, bucket_id, collection=None):
+        """Compress a bucket's open messages into its payload"""
+        collection = self.hot if collection is None else collection
+        bucket = collection.find_one({'_id': bucket_id}, {'payload': 1, 'messages': 1})
+        if bucket is None or not bucket.get('messages'):
+            return
+        messages = bucket_messages(bucket)
+        # The count filter skips the write if a message slipped in after the read
+        collection.update_one(
+            {'_id': bucket_id, 'count': len(messages)},
+            {'$set': {'payload': compress_messages(messages)}, '$unset': {'messages': ''}}
+        )
+
+    def _restore_archived(self, conversation_id):
+        """Move an archived conversation's buckets back to the hot tier; True if any moved"""
+        buckets = list(self.archive.find({'conversation_id': conversation_id}))
+        if not buckets:
+            return False
+        writes = []
+        for bucket in buckets:
+            bucket.pop('expire_at', None)
+            bucket.pop('_id', None)
+            writes.append(ReplaceOne({'conversation_id': conversation_id, 'bucket': bucket['bucket']},
+                                     bucket, upsert=True))
+        self.hot.bulk_write(writes, ordered=False)
+        self.archive.delete_many({'conversation_id': conversation_id})
+        return True
+
+    def get_messages(self, conversation_id):
+        """All messages of a conversation, in order, from whichever tiers hold it"""
+        buckets = []
+        for collection in (self.hot, self.archive):
+            buckets.extend(collection.find({'conversation_id': conversation_id},
+                                           {'bucket': 1, 'payload': 1, 'messages': 1}))
+        buckets.sort(key=lambda b: b['bucket'])
+        return [message for bucket in buckets for message in bucket_messages(bucket)]
+
+    def archive_cold(self, now=None, batch_size=500):
+        """Move conversations idle past archive_after into the TTL archive tier"""
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - self.archive_after
+
+        # A conversation is cold only if its newest bucket is older than the cutoff
+        cold_ids = self.hot.aggregate([
+            {'$group': {'_id': '$conversation_id', 'last': {'$max': '$last_message_at'}}},
+            {'$match': {'last': {'$lt': cutoff}}},
+        ], allowDiskUse=True)
+
+        moved = 0
+        batch = []
+        for row in cold_ids:
+            batch.append(row['_id'])
+            if len(batch) >= batch_size:
+                moved += self._move_to_archive(batch, cutoff)
+                batch = []
+        if batch:
+            moved += self._move_to_archive(batch, cutoff)
+        return moved
+
+    def _move_to_archive(self, conversation_ids, cutoff):
+        """Copy buckets into the archive (sealed, idempotently), then remove them from the hot tier
+
+        A bucket is only removed if it is still cold and holds the messages that were copied;
+        one that received a message in between stays hot and its archive copy is dropped.
+        """
+        writes = []
+        deletes = []
+        copied = []
+        for bucket in self.hot.find({'conversation_id': {'$in': conversation_ids}}):
+            bucket_id = bucket.pop('_id')
+            deletes.append(DeleteOne({'_id': bucket_id, 'count': bucket.get('count'),
+                                      'last_message_at': {'$lt': cutoff}}))
+            copied.append(bucket_id)
+            if bucket.get('messages'):
+                bucket['payload'] = compress_messages(bucket_messages(bucket))
+                bucket.pop('messages')
+            bucket['expire_at'] = _utc(bucket.get('last_message_at')) + self.retention
+            # Keyed like the unique index, so a re-run (or a bucket already archived) replaces in place
+            writes.append(ReplaceOne({'conversation_id': bucket['conversation_id'], 'bucket': bucket['bucket']},
+                                     bucket, upsert=True))
+        if writes:
+            self.archive.bulk_write(writes, ordered=False)
+            result = self.hot.bulk_write(deletes, ordered=False)
+            if result.deleted_count < len(deletes):
+                for bucket in self.hot.find({'_id': {'$in': copied}}, {'conversation_id': 1, 'bucket': 1}):
+                    self.archive.delete_one({'conversation_id': bucket['conversation_id'], 'bucket': bucket['bucket']})
+        return len(conversation_ids)
+
+    def migrate_legacy(self, messages_collection, batch_size=1000):
+        """Stream legacy per-message documents into buckets with bounded memory
+
+        Run before enabling live appends: buckets with the same numbers are replaced.
+        Creates the (conversation_id, timestamp, _id) index on the legacy collection if it is
+        missing, so the server walks it in order instead of sorting the whole collection.
+        """
+        messages_collection.create_index(LEGACY_ORDER, name=LEGACY_ORDER_INDEX)
+        cursor = messages_collection.find({}).sort(LEGACY_ORDER).hint(LEGACY_ORDER_INDEX).batch_size(batch_size)
+
+        migrated = 0
+        current_id = None
+        chunk = []
+        bucket = 0
+        writes = []
+
+        def flush_chunk():
+            nonlocal chunk, bucket
+            if not chunk:
+                return
+            scores = [float(m['interest_score']) for m in chunk
+                      if m.get('sender') == 'user' and isinstance(m.get('interest_score'), (int, float))]
+            document = {
+                'conversation_id': current_id,
+                'bucket': bucket,
+                'count': len(chunk),
+                'interest_scores': scores,
+                'first_message_at': _utc(chunk[0].get('timestamp')),
+                'last_message_at': _utc(chunk[-1].get('timestamp')),
+            }
+            if scores:
+                document['max_interest_score'] = max(scores)
+            # Full buckets are sealed; a partial last bucket stays open for new messages
+            if len(chunk) >= self.bucket_size:
+                document['payload'] = compress_messages(chunk)
+            else:
+                document['messages'] = chunk
+            writes.append(ReplaceOne({'conversation_id': current_id, 'bucket': bucket}, document, upsert=True))
+            chunk = []
+            bucket += 1
+
+        try:
+            for message in cursor:
+                message.pop('_id', None)
+                conversation_id = message.get('conversation_id')
+                if conversation_id != current_id:
+                    flush_chunk()
+                    current_id, bucket = conversation_id, 0
+                chunk.append(message)
+                migrated += 1
+                if len(chunk) >= self.bucket_size:
+                    flush_chunk()
+                if len(writes) >= 100:
+                    self.hot.bulk_write(writes, ordered=False)
+                    writes = []
+            flush_chunk()
+            if writes:
+                self.hot.bulk_write(writes, ordered=False)
+        finally:
+            cursor.close()
+        return migrated
+
+    def storage_stats(self):
+        """Document count, data size, storage size and index size per tier"""
+        stats = {}
+        for name in (HOT_COLLECTION, ARCHIVE_COLLECTION):
+            try:
+                coll_stats = self.db.command('collStats', name)
+                stats[name] = {
+                    'documents': coll_stats.get('count', 0),
+                    'size_bytes': coll_stats.get('size', 0),
+                    'storage_bytes': coll_stats.get('storageSize', 0),
+                    'index_bytes': coll_stats.get('totalIndexSize', 0),
+                }
+            except Exception as e:
+                stats[name] = {'error': str(e)}
+        return stats
+
+
+_conversation_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_conversation_archive():
+    """Process-wide archive when CONVERSATION_ARCHIVE is enabled, else None"""
+    global _conversation_archive
+    if os.getenv('CONVERSATION_ARCHIVE', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+    if _conversation_archive is None:
+        with _archive_lock:
+            if _conversation_archive is None:
+                archive = ConversationArchive.from_env()
+                archive.ensure_indexes()
+                _conversation_archive = archive
+    return _conversation_archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bucketed conversation storage maintenance")
+    parser.add_argument('command', choices=['migrate', 'archive', 'stats'])
+    parser.add_argument('--legacy-collection', default='messages',
+                        help="Per-message collection to migrate from")
+    args = parser.parse_args()
+
+    try:
+        archive = ConversationArchive.from_env()
+        archive.ensure_indexes()
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return
+
+    if args.command == 'migrate':
+        count = archive.migrate_legacy(archive.db[args.legacy_collection])
+        print(f"✅ Migrated {count} messages into {HOT_COLLECTION}")
+    elif args.command == 'archive':
+        count = archive.archive_cold()
+        print(f"✅ Archived {count} cold conversations into {ARCHIVE_COLLECTION}")
+
+    print("\n📊 Storage by tier")
+    print("=" * 40)
+    for name, stats in archive.storage_stats().items():
+        if 'error' in stats:
+            print(f"{name}: {stats['error']}")
+            continue
+        print(f"{name}: {stats['documents']} docs, data {stats['size_bytes'] / 1024:.1f} KB, "
+              f"storage {stats['storage_bytes'] / 1024:.1f} KB, indexes {stats['index_bytes'] / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
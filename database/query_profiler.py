@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+🔬 FoodieBot Query Profiler & Index Advisor
+Records which filter combinations search_products actually sends,
+how long they take and how much of the collection they scan
+
+Features:
+- Canonical query shapes (which filters, which operators, which sort)
+- Latency per shape and sampled explain() plans (docs examined vs returned),
+  explained on a background thread so requests never wait on the server
+- Every entry is tagged with its source: 'mongo' (database calls) or 'store_view'
+  (in-memory store catalog searches, timed but never explained)
+- JSONL profile log shared across processes
+- Compound index proposals following the Equality-Sort-Range rule, from mongo entries only
+- In-memory products collection stand-in for offline testing
+
+Usage:
+  python -m database.query_profiler report [--log PATH] [--top N]
+  python -m database.query_profiler apply  [--log PATH] [--top N]   # create proposed indexes
+"""
+
+import argparse
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+DEFAULT_LOG_PATH = './analytics/query_profile.jsonl'
+
+MONGO_SOURCE = 'mongo'
+STORE_VIEW_SOURCE = 'store_view'
+
+# How each search_products parameter is matched, for shape and index purposes
+PARAM_FIELDS = {
+    'category': ('category', 'eq'),
+    'dietary_tags': ('dietary_tags', 'in'),
+    'min_price': ('price', 'range'),
+    'max_price': ('price', 'range'),
+    # build_mongo_query matches the text against any of these fields
+    'search_text': ('or(name,description,ingredients)', 'regex'),
+}
+
+DEFAULT_SORT = [('popularity_score', -1)]
+
+
+def query_shape(params):
+    """Canonical shape string for a set of search_products keyword arguments"""
+    fields = {}
+    for key, value in params.items():
+        if value in (None, '', []) or key not in PARAM_FIELDS:
+            continue
+        field, op = PARAM_FIELDS[key]
+        fields[field] = op
+    parts = [f"{field}:{op}" for field, op in sorted(fields.items())]
+    parts.append("sort:" + ",".join(f"{f}{'-' if d < 0 else '+'}" for f, d in DEFAULT_SORT))
+    return " | ".join(parts)
+
+
+def build_mongo_query(category=None, dietary_tags=None, min_price=None, max_price=None,
+                      search_text=None, limit=20, **_):
+    """Filter, sort and limit equivalent to a search_products call"""
+    query = {}
+    if category:
+        query['category'] = category
+    if dietary_tags:
+        query['dietary_tags'] = {'$in': list(dietary_tags)}
+    if min_price is not None or max_price is not None:
+        price = {}
+        if min_price is not None:
+            price['$gte'] = min_price
+        if max_price is not None:
+            price['$lte'] = max_price
+        query['price'] = price
+    if search_text:
+        pattern = re.escape(search_text)
+        query['$or'] = [
+            {'name': {'$regex': pattern, '$options': 'i'}},
+            {'description': {'$regex': pattern, '$options': 'i'}},
+            {'ingredients': {'$regex': pattern, '$options': 'i'}},
+        ]
+    return query, list(DEFAULT_SORT), limit
+
+
+def _winning_stages(plan):
+    """All stage names in a winning plan tree"""
+    stages = []
+    while plan:
+        stages.append(plan.get('stage'))
+        if 'inputStage' in plan:
+            plan = plan['inputStage']
+        elif plan.get('inputStages'):
+            for child in plan['inputStages']:
+                stages.extend(_winning_stages(child))
+            break
+        else:
+            break
+    return stages
+
+
+def summarize_explain(explain):
+    """Extract docs/keys examined, docs returned and scan type from an explain() result"""
+    stats = explain.get('executionStats', {})
+    winning = explain.get('queryPlanner', {}).get('winningPlan', {})
+    # Sharded and newer servers nest the plan one level deeper
+    winning = winning.get('queryPlan', winning)
+    stages = [s for s in _winning_stages(winning) if s]
+    return {
+        'docs_examined': stats.get('totalDocsExamined'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'n_returned': stats.get('nReturned'),
+        'collscan': 'COLLSCAN' in stages,
+        'stages': stages,
+    }
+
+
+class QueryProfiler:
+    """Times search_products calls by shape and samples their query plans"""
+
+    def __init__(self, log_path=DEFAULT_LOG_PATH, collection=None, explain_every=10, window=200):
+        self.log_path = log_path
+        self.collection = collection
+        self.explain_every = explain_every
+        self.window = window
+        self.shapes = {}
+        self._lock = threading.Lock()
+        # Sampled explain() calls run here, off the request thread; excess samples are dropped
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._explain_thread = None
+
+    @classmethod
+    def from_env(cls):
+        """Profiler configured from the environment, or None when profiling is off"""
+        if os.getenv('QUERY_PROFILING', 'false').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            log_path=os.getenv('QUERY_PROFILE_LOG', DEFAULT_LOG_PATH),
+            explain_every=int(os.getenv('QUERY_PROFILE_EXPLAIN_EVERY', '10')),
+        )
+
+    def _products_collection(self):
+        """Collection used for explain(), connecting from the .env settings on first use"""
+        if self.collection is None:
+            self.collection = get_products_collection()
+        return self.collection
+
+    def wrap(self, db_manager, source=MONGO_SOURCE):
+        """Instrument db_manager.search_products in place and return the manager
+
+        `source` tags the entries: MONGO_SOURCE for database managers, STORE_VIEW_SOURCE
+        for in-memory store views.
+        """
+        original = db_manager.search_products
+        if getattr(original, '_profiled', False):
+            return db_manager
+
+        def profiled_search_products(*args, **params):
+            started = time.perf_counter()
+            results = original(*args, **params)
+            self.record(params, (time.perf_counter() - started) * 1000, len(results), source=source)
+            return results
+
+        profiled_search_products._profiled = True
+        db_manager.search_products = profiled_search_products
+        return db_manager
+
+    def record(self, params, elapsed_ms, n_results, source=MONGO_SOURCE):
+        """Record one call; every `explain_every`-th mongo call per shape also queues a plan capture"""
+        shape = query_shape(params)
+        with self._lock:
+            stats = self.shapes.setdefault((source, shape), {
+                'count': 0,
+                'total_ms': 0.0,
+                'latencies': deque(maxlen=self.window),
+                'plan': None,
+            })
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['latencies'].append(elapsed_ms)
+            # In-memory searches send nothing to MongoDB, so don't make them send explain()s either
+            should_explain = (source == MONGO_SOURCE and self.explain_every
+                              and (stats['count'] - 1) % self.explain_every == 0)
+
+        self._append_log({
+            'ts': time.time(),
+            'source': source,
+            'shape': shape,
+            'params': sorted(k for k, v in params.items() if v not in (None, '', [])),
+            'ms': round(elapsed_ms, 3),
+            'n_results': n_results,
+        })
+
+        if should_explain:
+            self._queue_explain(shape, dict(params), stats)
+
+    def _queue_explain(self, shape, params, stats):
+        """Hand a plan capture to the background explain thread (dropped if it is backed up)"""
+        if self._explain_thread is None:
+            with self._lock:
+                if self._explain_thread is None:
+                    self._explain_thread = threading.Thread(target=self._explain_worker,
+                                                            name='foodiebot-query-explain', daemon=True)
+                    self._explain_thread.start()
+        try:
+            self._explain_queue.put_nowait((shape, params, stats))
+        except queue.Full:
+            pass
+
+    def _explain_worker(self):
+        while True:
+            shape, params, stats = self._explain_queue.get()
+            try:
+                self.explain(shape, params, stats)
+            finally:
+                self._explain_queue.task_done()
+
+    def explain(self, shape, params, stats=None):
+        """Capture the plan for one call's query and log it as a plan entry"""
+        try:
+            query, sort, limit = build_mongo_query(**params)
+            cursor = self._products_collection().find(query).sort(sort).limit(limit or 0)
+            plan = summarize_explain(cursor.explain())
+        except Exception as e:
+            print(f"Error explaining query shape {shape}: {e}")
+            return None
+        if stats is not None:
+            with self._lock:
+                stats['plan'] = plan
+        # Plan entries carry no 'ms': they update a shape's plan without counting as a call
+        self._append_log({'ts': time.time(), 'source': MONGO_SOURCE, 'shape': shape, 'plan': plan})
+        return plan
+
+    def _append_log(self, entry):
+        """Append one profile entry to the shared JSONL log"""
+        if not self.log_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            with self._lock, open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        except Exception as e:
+            print(f"Error writing query profile: {e}")
+
+    def summary(self):
+        """Per-shape statistics from this process, hottest (by total time) first"""
+        with self._lock:
+            rows = []
+            for (source, shape), stats in self.shapes.items():
+                latencies = sorted(stats['latencies'])
+                plan = stats['plan'] or {}
+                rows.append({
+                    'source': source,
+                    'shape': shape,
+                    'count': stats['count'],
+                    'total_ms': stats['total_ms'],
+                    'avg_ms': stats['total_ms'] / stats['count'],
+                    'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                    'docs_examined': plan.get('docs_examined'),
+                    'n_returned': plan.get('n_returned'),
+                    'collscan': plan.get('collscan'),
+                })
+        return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+
+
+def summarize_log(log_path):
+    """Aggregate a profile log into per-shape statistics, hottest first"""
+    shapes = {}
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            # Entries from before sources were recorded all came from MongoDB
+            source = entry.get('source', MONGO_SOURCE)
+            stats = shapes.setdefault((source, entry['shape']), {
+                'source': source, 'shape': entry['shape'], 'count': 0, 'total_ms': 0.0,
+                'latencies': [], 'plan': None,
+            })
+            if entry.get('plan'):
+                stats['plan'] = entry['plan']
+            if 'ms' not in entry:
+                continue
+            stats['count'] += 1
+            stats['total_ms'] += entry['ms']
+            stats['latencies'].append(entry['ms'])
+
+    rows = []
+    for stats in shapes.values():
+        if not stats['count']:
+            continue
+        latencies = sorted(stats.pop('latencies'))
+        plan = stats.pop('plan') or {}
+        stats['avg_ms'] = stats['total_ms'] / stats['count']
+        stats['p95_ms'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        stats['docs_examined'] = plan.get('docs_examined')
+        stats['n_returned'] = plan.get('n_returned')
+        stats['collscan'] = plan.get('collscan')
+        rows.append(stats)
+    return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+
+
+def propose_index(shape):
+    """Compound index keys for a shape using the Equality-Sort-Range rule, or None"""
+    fields = {}
+    sort = []
+    for part in shape.split(" | "):
+        name, _, op = part.partition(":")
+        if name == 'sort':
+            for key in op.split(","):
+                if key:
+                    sort.append((key[:-1], -1 if key.endswith('-') else 1))
+        else:
+            fields[name] = op
+
+    equality = [(f, 1) for f, op in sorted(fields.items()) if op == 'eq']
+    # $in on an array field behaves like a range once a sort is involved;
+    # unanchored regexes can't use an index at all
+    ranges = [(f, 1) for f, op in sorted(fields.items()) if op in ('in', 'range')]
+    keys = equality + sort + ranges
+
+    if not equality and not ranges:
+        return None
+    return keys
+
+
+def _covered(keys, existing_indexes):
+    """True if an existing index already starts with the proposed keys"""
+    for info in existing_indexes.values():
+        existing = []
+        for k, d in info.get('key', []):
+            # Text, hashed and geo keys ('text', 'hashed', '2dsphere') can't serve an ESR prefix
+            if isinstance(d, bool) or not isinstance(d, (int, float)):
+                break
+            existing.append((k, int(d)))
+        if existing[:len(keys)] == keys:
+            return True
+    return False
+
+
+def advise(rows, collection=None, top=5):
+    """Index proposals for the hottest MongoDB shapes, skipping ones already covered"""
+    existing = collection.index_information() if collection is not None else {}
+    proposals = []
+    seen = set()
+    # Store-view searches never reach MongoDB, so their shapes say nothing about its indexes
+    mongo_rows = [row for row in rows if row.get('source', MONGO_SOURCE) == MONGO_SOURCE]
+    for row in mongo_rows[:top]:
+        keys = propose_index(row['shape'])
+        if not keys or tuple(keys) in seen:
+            continue
+        seen.add(tuple(keys))
+        if _covered(keys, existing):
+            continue
+        proposals.append({'shape': row['shape'], 'keys': keys, 'count': row['count'], 'total_ms': row['total_ms']})
+    return proposals
+
+
+def create_indexes(collection, proposals):
+    """Create the proposed compound indexes; returns the created index names"""
+    created = []
+    for proposal in proposals:
+        name = "profiler_" + "_".join(f"{k}_{d}" for k, d in proposal['keys'])
+        created.append(collection.create_index(proposal['keys'], name=name))
+    return created
+
+
+def get_products_collection():
+    """Products collection from the .env MongoDB settings"""
+    from database.connection import get_database
+    return get_database()['products']
+
+
+class InMemoryProductCollection:
+    """Stand-in for the products collection that records query shapes and fakes plans"""
+
+    def __init__(self, products):
+        self.products = list(products)
+        self.indexes = {'_id_': {'key': [('_id', 1)]}}
+        self.recorded = []
+
+    def find(self, query=None, *args, **kwargs):
+        self.recorded.append(query or {})
+        return _InMemoryCursor(self, query or {})
+
+    def index_information(self):
+        return dict(self.indexes)
+
+    def create_index(self, keys, name=None):
+        name = name or "_".join(f"{k}_{d}" for k, d in keys)
+        self.indexes[name] = {'key': list(keys)}
+        return name
+
+
+class _InMemoryCursor:
+    """Minimal cursor supporting sort/limit/explain/iteration"""
+
+    def __init__(self, collection, query):
+        self._collection = collection
+        self._query = query
+        self._sort = []
+        self._limit = 0
+
+    def sort(self, keys, direction=None):
+        self._sort = keys if isinstance(keys, list) else [(keys, direction or 1)]
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def _matches(self, product):
+        for field, condition in self._query.items():
+            if field == '$or':
+                if not any(_InMemoryCursor(self._collection, sub)._matches(product) for sub in condition):
+                    return False
+                continue
+            value = product.get(field)
+            if not isinstance(condition, dict):
+                if value != condition:
+                    return False
+                continue
+            values = value if isinstance(value, list) else [value]
+            if '$in' in condition and not set(values) & set(condition['$in']):
+                return False
+            if '$gte' in condition and (value is None or value < condition['$gte']):
+                return False
+            if '$lte' in condition and (value is None or value > condition['$lte']):
+                return False
+            if '$regex' in condition:
+                flags = re.IGNORECASE if 'i' in condition.get('$options', '') else 0
+                if not any(re.search(condition['$regex'], str(v), flags) for v in values):
+                    return False
+        return True
+
+    def _results(self):
+        results = [p for p in self._collection.products if self._matches(p)]
+        for field, direction in reversed(self._sort):
+            results.sort(key=lambda p: p.get(field, 0), reverse=direction < 0)
+        return results[:self._limit] if self._limit else results
+
+    def __iter__(self):
+        return iter(self._results())
+
+    def explain(self):
+        """Plan summary: IXSCAN when an index starts with a queried or sorted field"""
+        queried = [f for f in self._query if not f.startswith('$')] + [f for f, _ in self._sort]
+        index_used = any(
+            info['key'] and info['key'][0][0] in queried
+            for name, info in self._collection.indexes.items() if name != '_id_'
+        )
+        results = self._results()
+        total = len(self._collection.products)
+        examined = len([p for p in self._collection.products if self._matches(p)]) if index_used else total
+        stage = {'stage': 'IXSCAN'} if index_used else {'stage': 'COLLSCAN'}
+        return {
+            'queryPlanner': {'winningPlan': {'stage': 'LIMIT', 'inputStage': {'stage': 'FETCH', 'inputStage': stage}}},
+            'executionStats': {
+                'nReturned': len(results),
+                'totalDocsExamined': examined,
+                'totalKeysExamined': examined if index_used else 0,
+            },
+        }
+
+
+# Process-wide profiler; None unless QUERY_PROFILING is enabled
+query_profiler = QueryProfiler.from_env()
+
+
+def print_report(rows, proposals):
+    """Print the shape table and index proposals"""
+    print("🔬 search_products Query Shapes")
+    print("=" * 60)
+    for row in rows:
+        scan = "COLLSCAN ⚠️" if row.get('collscan') else ("index" if row.get('collscan') is False else "no plan")
+        examined = row.get('docs_examined')
+        ratio = f"{examined}/{row.get('n_returned')}" if examined is not None else "-"
+        if row.get('source', MONGO_SOURCE) != MONGO_SOURCE:
+            scan = "in-memory"
+        print(f"{row['count']:>6}x  avg {row['avg_ms']:7.2f} ms  p95 {row['p95_ms']:7.2f} ms  "
+              f"examined/returned {ratio:>9}  {scan}")
+        print(f"        [{row.get('source', MONGO_SOURCE)}] {row['shape']}")
+
+    print("\n📇 Index Proposals")
+    print("=" * 60)
+    if not proposals:
+        print("No new indexes needed for the hottest shapes")
+    for proposal in proposals:
+        keys = ", ".join(f"{k}: {d}" for k, d in proposal['keys'])
+        print(f"{{{keys}}}  ← {proposal['shape']} ({proposal['count']} calls)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report search_products query shapes and propose indexes")
+    parser.add_argument('command', choices=['report', 'apply'])
+    parser.add_argument('--log', default=os.getenv('QUERY_PROFILE_LOG', DEFAULT_LOG_PATH))
+    parser.add_argument('--top', type=int, default=5, help="Number of hottest shapes to index")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"❌ No profile log at {args.log} (run the app with QUERY_PROFILING=true)")
+        return
+
+    rows = summarize_log(args.log)
+    try:
+        collection = get_products_collection()
+        proposals = advise(rows, collection, top=args.top)
+    except Exception as e:
+        print(f"⚠️ Could not read existing indexes: {e}")
+        collection = None
+        proposals = advise(rows, top=args.top)
+
+    print_report(rows, proposals)
+
+    if args.command == 'apply':
+        if collection is None:
+            print("❌ Cannot create indexes without a database connection")
+            return
+        for name in create_indexes(collection, proposals):
+            print(f"✅ Created index {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,25 +17,36 @@ import plotly.graph_objects as go
 import pandas as pd
 import json
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import sys
 import os
+import uuid
 
 # Add project paths
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database.mongodb_manager import MongoDBManager
+from database.query_profiler import STORE_VIEW_SOURCE, query_profiler
+from database.conversation_archive import get_conversation_archive
 from src.mongodb_enhanced_agent import MongoDBEnhancedFoodieBotAgent
 from src.ai_service import ai_service
+from src.llm_admission import llm_admission, primary_provider, PRIORITY_IN_FLIGHT, PRIORITY_NEW_CONVERSATION
+from src.prompt_context import PromptContext
+from src.catalog_store import get_catalog_store
+from src.store_catalog import get_store_catalog
+from src.typeahead import get_typeahead_index
+from src.meal_bundles import get_bundle_engine
+from src.session_registry import session_registry
+from src.nlp_pipeline import nlp_pipeline
 
-def get_related_products(reference_product, db_manager, exclude_ids=None, limit=4):
-    """Get products related/similar to the reference product, excluding specified IDs"""
+def get_related_products(reference_product, store_view, exclude_ids=None, limit=4):
+    """Get products related/similar to the reference product within a store, excluding specified IDs"""
     if exclude_ids is None:
         exclude_ids = []
     
     try:
         # Strategy 1: Same category, different products
-        same_category_products = db_manager.search_products(
+        same_category_products = store_view.search_products(
             category=reference_product.get('category'),
             limit=limit * 2
         )
@@ -50,7 +61,7 @@ def get_related_products(reference_product, db_manager, exclude_ids=None, limit=
         dietary_tags = reference_product.get('dietary_tags', [])
         similar_dietary_products = []
         if dietary_tags:
-            similar_dietary_products = db_manager.search_products(
+            similar_dietary_products = store_view.search_products(
                 dietary_tags=dietary_tags[:2],  # Use first 2 dietary tags
                 limit=limit * 2
             )
@@ -61,7 +72,7 @@ def get_related_products(reference_product, db_manager, exclude_ids=None, limit=
         
         # Strategy 3: Similar price range (±$3)
         ref_price = reference_product.get('price', 10)
-        similar_price_products = db_manager.search_products(
+        similar_price_products = store_view.search_products(
             min_price=max(0, ref_price - 3),
             max_price=ref_price + 3,
             limit=limit * 2
@@ -139,7 +150,7 @@ def get_related_products(reference_product, db_manager, exclude_ids=None, limit=
         print(f"Error getting related products: {e}")
         # Fallback: get popular products excluding the specified IDs
         try:
-            fallback_products = db_manager.get_popular_products(limit * 2)
+            fallback_products = store_view.get_popular_products(limit * 2)
             return [
                 p for p in fallback_products 
                 if p.get('product_id') not in exclude_ids
@@ -147,6 +158,41 @@ def get_related_products(reference_product, db_manager, exclude_ids=None, limit=
         except:
             return []
 
+def use_search_suggestion(name):
+    """Put a typeahead suggestion into the Product Explorer search box"""
+    st.session_state.explorer_search = name
+
+def local_fallback_response(store_view, user_input, last_interest_score=0):
+    """Fast local reply used when the LLM queue cannot admit a request in time"""
+    # Score the message with the local NLP pipeline so interest keeps moving without the LLM
+    try:
+        analysis = nlp_pipeline.preprocess(user_input)
+        interest_score = max(0, min(100, last_interest_score + analysis.score_delta))
+    except Exception as e:
+        print(f"Error scoring message locally: {e}")
+        interest_score = last_interest_score
+    
+    try:
+        popular = store_view.get_popular_products(3)
+    except Exception as e:
+        print(f"Error getting fallback products: {e}")
+        popular = []
+    
+    if popular:
+        names = ", ".join(p.get('name', 'a fan favourite') for p in popular)
+        message = (f"We're serving a lot of hungry guests right now! While I catch up, "
+                   f"here are some crowd favourites: {names}. Tell me more about what you're craving.")
+    else:
+        message = "We're serving a lot of hungry guests right now! Give me a moment and ask again."
+    
+    return {
+        'response': message,
+        'interest_score': interest_score,
+        'recommendations': popular,
+        'ai_intent': None,
+        'fallback': True
+    }
+
 # Configure Streamlit
 st.set_page_config(
     page_title="🤖 FoodieBot Enhanced",
@@ -333,40 +379,64 @@ where(.st-emotion-cache-1y4p8pa) {
 </style>
 """, unsafe_allow_html=True)
 
+def build_session_resources(session):
+    """Attach the agent and database manager to a new or rehydrated session"""
+    try:
+        session.mongodb_agent = MongoDBEnhancedFoodieBotAgent()
+    except Exception as e:
+        st.error(f"Failed to initialize FoodieBot: {e}")
+        st.stop()
+    
+    try:
+        session.db_manager = MongoDBManager()
+    except Exception as e:
+        st.error(f"Failed to connect to database: {e}")
+        st.stop()
+    
+    if query_profiler is not None:
+        query_profiler.wrap(session.db_manager)
+        # The agent queries through its own manager when it exposes one
+        agent_db_manager = getattr(session.mongodb_agent, 'db_manager', None)
+        if agent_db_manager is not None and hasattr(agent_db_manager, 'search_products'):
+            query_profiler.wrap(agent_db_manager)
+
 def initialize_session_state():
     """Initialize all session state variables"""
-    if 'mongodb_agent' not in st.session_state:
-        try:
-            st.session_state.mongodb_agent = MongoDBEnhancedFoodieBotAgent()
-        except Exception as e:
-            st.error(f"Failed to initialize FoodieBot: {e}")
-            st.stop()
+    # Streamlit's session state only holds a token; the registry owns the heavy state
+    # so idle sessions can be released and rehydrated later
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = uuid.uuid4().hex
     
-    if 'db_manager' not in st.session_state:
-        try:
-            st.session_state.db_manager = MongoDBManager()
-        except Exception as e:
-            st.error(f"Failed to connect to database: {e}")
-            st.stop()
-    
-    if 'conversation_history' not in st.session_state:
-        st.session_state.conversation_history = []
-    
-    if 'current_conversation_id' not in st.session_state:
-        conv_id, greeting = st.session_state.mongodb_agent.start_conversation()
-        st.session_state.current_conversation_id = conv_id
-        st.session_state.conversation_history.append({
+    session = session_registry.get_or_create(st.session_state.session_token, build_session_resources)
+    
+    if session.prompt_context is None:
+        session.prompt_context = PromptContext()
+    
+    if session.rehydrated:
+        # The agent was rebuilt, so open a fresh agent conversation behind the restored transcript
+        conv_id, _ = session.mongodb_agent.start_conversation()
+        session.current_conversation_id = conv_id
+        session.rehydrated = False
+    
+    if session.current_conversation_id is None:
+        conv_id, greeting = session.mongodb_agent.start_conversation()
+        session.current_conversation_id = conv_id
+        session.prompt_context.add_message('bot', greeting)
+        session.conversation_history.append({
             'sender': 'bot',
             'message': greeting,
-            'timestamp': datetime.now(),
+            'timestamp': datetime.now(timezone.utc),
             'interest_score': 0
         })
     
-    if 'total_recommendations' not in st.session_state:
-        st.session_state.total_recommendations = []
+    return session
 
 # Initialize
-initialize_session_state()
+nlp_pipeline.warm_up()  # loads tokenizer/sentiment resources once per process, in the background
+session = initialize_session_state()
+catalog = get_catalog_store(session.db_manager)
+store_catalog = get_store_catalog(catalog)
+typeahead = get_typeahead_index(catalog)
 
 # Main Header
 st.markdown("""
@@ -381,8 +451,8 @@ st.markdown("""
 col1, col2, col3 = st.columns(3)
 
 # Get system stats
-ai_status = st.session_state.mongodb_agent.ai_status
-conversation_count = len(st.session_state.conversation_history)
+ai_status = session.mongodb_agent.ai_status
+conversation_count = len(session.conversation_history)
 
 with col1:
     gemini_status = "🟢 Active" if ai_status['gemini_available'] else "🔴 Offline"
@@ -415,6 +485,21 @@ with col3:
 
 # Sidebar Navigation
 st.sidebar.title("🧭 Navigation")
+
+# Store selection: every product lookup below is scoped to this store's catalog
+store_ids = store_catalog.store_ids()
+if 'store_id' not in st.session_state:
+    default_store = os.getenv('STORE_ID', store_ids[0])
+    st.session_state.store_id = default_store if default_store in store_ids else store_ids[0]
+if len(store_ids) > 1:
+    st.session_state.store_id = st.sidebar.selectbox(
+        "🏪 Store", store_ids, index=store_ids.index(st.session_state.store_id)
+    )
+store = store_catalog.view(st.session_state.store_id)
+if query_profiler is not None:
+    # Explorer and related-product searches run against the in-memory store view; they are
+    # profiled under their own source and kept out of MongoDB index advice
+    query_profiler.wrap(store, source=STORE_VIEW_SOURCE)
 page = st.sidebar.selectbox("Choose Experience", [
     "🤖 AI Chat",
     "📊 Analytics Dashboard", 
@@ -437,7 +522,7 @@ if page == "🤖 AI Chat":
             st.markdown('<div class="chat-container">', unsafe_allow_html=True)
             
             # Display conversation history
-            for msg in st.session_state.conversation_history:
+            for msg in session.conversation_history:
                 if msg['sender'] == 'user':
                     st.markdown(f"""
                     <div class="user-message">
@@ -470,9 +555,20 @@ if page == "🤖 AI Chat":
         
         with col_send:
             if st.button("Send 📤", key="send_btn") and user_input:
-                # Process message
+                # Process message through the shared LLM admission queue
+                user_scores = [msg.get('interest_score', 0) 
+                               for msg in session.conversation_history 
+                               if msg['sender'] == 'user']
+                priority = PRIORITY_IN_FLIGHT if user_scores else PRIORITY_NEW_CONVERSATION
+                last_score = user_scores[-1] if user_scores else 0
+                
                 with st.spinner("🤖 FoodieBot is thinking..."):
-                    response = st.session_state.mongodb_agent.process_message(user_input)
+                    response = llm_admission.run(
+                        lambda: session.mongodb_agent.process_message(user_input),
+                        lambda: local_fallback_response(store, user_input, last_score),
+                        providers=primary_provider(ai_status),
+                        priority=priority
+                    )
                 
                 # Build query information string
                 query_info_str = ""
@@ -488,39 +584,63 @@ if page == "🤖 AI Chat":
                     if query_parts:
                         query_info_str = "; ".join(query_parts)
                 
+                # Keep only recommendations this store can serve, as product IDs
+                recommended_ids = [
+                    record.product_id
+                    for record in store.records(catalog.ids_for(response.get('recommendations', [])))
+                ]
+                
                 # Add to conversation history
-                st.session_state.conversation_history.append({
+                session.conversation_history.append({
                     'sender': 'user',
                     'message': user_input,
-                    'timestamp': datetime.now(),
+                    'timestamp': datetime.now(timezone.utc),
                     'interest_score': response['interest_score'],
                     'query_info': query_info_str if query_info_str else None
                 })
                 
-                st.session_state.conversation_history.append({
+                session.conversation_history.append({
                     'sender': 'bot',
                     'message': response['response'],
-                    'timestamp': datetime.now(),
+                    'timestamp': datetime.now(timezone.utc),
                     'interest_score': 0,
-                    'recommendations': response.get('recommendations', [])
+                    'recommendations': recommended_ids
                 })
                 
-                # Store recommendations
-                if response['recommendations']:
-                    st.session_state.total_recommendations.extend(response['recommendations'])
+                # Append the exchange to the bucketed conversation store
+                try:
+                    conversation_archive = get_conversation_archive()
+                    if conversation_archive is not None:
+                        for msg in session.conversation_history[-2:]:
+                            conversation_archive.append_message(session.current_conversation_id, msg)
+                except Exception as e:
+                    print(f"Error archiving conversation messages: {e}")
+                
+                # Keep the bounded prompt context in step with the conversation. The agent
+                # still builds its own prompt, so render() only records the estimated size.
+                session.prompt_context.add_message('user', user_input, response.get('ai_intent'))
+                session.prompt_context.add_message('bot', response['response'])
+                session.prompt_context.render()
+                
+                # Store recommendations as product IDs; details live in the shared catalog
+                if recommended_ids:
+                    session.total_recommendations.extend(recommended_ids)
+                    get_bundle_engine(catalog).record_baskets([recommended_ids])
                 
                 st.rerun()
         
         with col_clear:
             if st.button("Clear Chat 🗱️", key="clear_btn"):
-                st.session_state.conversation_history = []
-                st.session_state.total_recommendations = []
-                conv_id, greeting = st.session_state.mongodb_agent.start_conversation()
-                st.session_state.current_conversation_id = conv_id
-                st.session_state.conversation_history.append({
+                session.conversation_history = []
+                session.total_recommendations = []
+                session.prompt_context = PromptContext()
+                conv_id, greeting = session.mongodb_agent.start_conversation()
+                session.current_conversation_id = conv_id
+                session.prompt_context.add_message('bot', greeting)
+                session.conversation_history.append({
                     'sender': 'bot',
                     'message': greeting,
-                    'timestamp': datetime.now(),
+                    'timestamp': datetime.now(timezone.utc),
                     'interest_score': 0,
                     'recommendations': []
                 })
@@ -531,9 +651,9 @@ if page == "🤖 AI Chat":
         
         # Get products shown in recent bot messages to find related items
         shown_products = []
-        for msg in reversed(st.session_state.conversation_history):
+        for msg in reversed(session.conversation_history):
             if msg['sender'] == 'bot' and msg.get('recommendations'):
-                shown_products.extend(msg['recommendations'])
+                shown_products.extend(store.records(msg['recommendations']))
                 if len(shown_products) >= 2:  # Get last 2 shown products as reference
                     break
         
@@ -546,19 +666,20 @@ if page == "🤖 AI Chat":
             # Get related products based on category and attributes
             related_recommendations = get_related_products(
                 reference_product, 
-                st.session_state.db_manager,
+                store,
                 exclude_ids=[p.get('product_id') for p in shown_products],
                 limit=4
             )
-        elif st.session_state.total_recommendations:
+        elif session.total_recommendations:
             # Fallback: get related to any previously recommended product
-            reference_product = st.session_state.total_recommendations[-1]
-            related_recommendations = get_related_products(
-                reference_product,
-                st.session_state.db_manager,
-                exclude_ids=[p.get('product_id') for p in st.session_state.total_recommendations[-5:]],
-                limit=4
-            )
+            reference_product = store.record(session.total_recommendations[-1])
+            if reference_product is not None:
+                related_recommendations = get_related_products(
+                    reference_product,
+                    store,
+                    exclude_ids=session.total_recommendations[-5:],
+                    limit=4
+                )
         
         # Display related recommendations
         if related_recommendations:
@@ -578,9 +699,9 @@ if page == "🤖 AI Chat":
             st.info("🤖 Start chatting to get personalized recommendations!")
         
         # Interest Score Progress
-        if len(st.session_state.conversation_history) > 1:
+        if len(session.conversation_history) > 1:
             interest_scores = [msg.get('interest_score', 0) 
-                             for msg in st.session_state.conversation_history 
+                             for msg in session.conversation_history 
                              if msg['sender'] == 'user']
             
             if interest_scores:
@@ -597,35 +718,40 @@ if page == "🤖 AI Chat":
                     st.warning("👍 Good interest level")
                 else:
                     st.info("💭 Building interest...")
+        
+        # Prompt context size
+        prompt_context = session.prompt_context
+        st.caption(f"🧾 Prompt context (estimate): {prompt_context.last_prompt_tokens()} tokens "
+                   f"(budget {prompt_context.token_budget}) • Preferences: {prompt_context.preference_text()}")
 
 elif page == "📊 Analytics Dashboard":
     st.header("📊 Real-time Analytics Dashboard")
     
     # Get analytics data
     try:
-        analytics = st.session_state.db_manager.get_analytics_data()
+        analytics = session.db_manager.get_analytics_data()
         
         # Key Metrics
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total Products", analytics.get('total_products', db_stats))
+            st.metric("Total Products", analytics.get('total_products', len(catalog)))
         
         with col2:
             st.metric("Conversations", analytics.get('total_conversations', 0))
         
         with col3:
-            st.metric("Messages", analytics.get('total_messages', len(st.session_state.conversation_history)))
+            st.metric("Messages", analytics.get('total_messages', len(session.conversation_history)))
         
         with col4:
-            st.metric("Recommendations", analytics.get('total_recommendations', len(st.session_state.total_recommendations)))
+            st.metric("Recommendations", analytics.get('total_recommendations', len(session.total_recommendations)))
         
         # Interest Score Trend
-        if len(st.session_state.conversation_history) > 1:
+        if len(session.conversation_history) > 1:
             st.subheader("📈 Interest Score Progression")
             
             scores_data = []
-            for i, msg in enumerate(st.session_state.conversation_history):
+            for i, msg in enumerate(session.conversation_history):
                 if msg['sender'] == 'user' and msg.get('interest_score'):
                     scores_data.append({
                         'Message': i+1,
@@ -641,19 +767,24 @@ elif page == "📊 Analytics Dashboard":
                 st.plotly_chart(fig, use_container_width=True)
         
         # Recommendations by Category
-        if st.session_state.total_recommendations:
+        if session.total_recommendations:
             st.subheader("🍕 Recommendations by Category")
             
-            categories = {}
-            for rec in st.session_state.total_recommendations:
-                cat = rec.get('category', 'Other')
-                categories[cat] = categories.get(cat, 0) + 1
+            categories = catalog.category_counts(session.total_recommendations)
             
             if categories:
                 fig = px.pie(values=list(categories.values()), 
                            names=list(categories.keys()),
                            title="Recommendation Distribution")
                 st.plotly_chart(fig, use_container_width=True)
+        
+        # Catalog Price Bands
+        st.subheader("💰 Catalog Price Bands")
+        price_bands = catalog.price_bands()
+        fig = px.bar(x=list(price_bands.keys()), y=list(price_bands.values()),
+                     labels={'x': 'Price Band', 'y': 'Products'},
+                     title="Products per Price Band")
+        st.plotly_chart(fig, use_container_width=True)
     
     except Exception as e:
         st.error(f"Analytics error: {e}")
@@ -666,7 +797,19 @@ elif page == "🍔 Product Explorer":
     col1, col2, col3 = st.columns([2, 1, 1])
     
     with col1:
-        search_term = st.text_input("🔍 Search products...")
+        search_term = st.text_input("🔍 Search products...", key="explorer_search")
+        
+        # Typeahead suggestions from the in-memory index (no database round trip).
+        # st.text_input reruns on Enter or blur, not on every keystroke.
+        if search_term:
+            suggestions = typeahead.suggest(search_term, limit=6, available=store.available)
+            if suggestions:
+                suggestion_cols = st.columns(len(suggestions))
+                for suggestion_col, suggestion in zip(suggestion_cols, suggestions):
+                    with suggestion_col:
+                        label = f"{'≈ ' if suggestion['fuzzy'] else ''}{suggestion['name']}"
+                        st.button(label, key=f"suggest_{suggestion['product_id']}",
+                                  on_click=use_search_suggestion, args=(suggestion['name'],))
     
     with col2:
         max_price = st.slider("💰 Max Price", 5, 50, 25, 5)
@@ -675,13 +818,45 @@ elif page == "🍔 Product Explorer":
         results_limit = st.selectbox("📊 Show Results", [20, 50, 100, "All"], index=2)
     
     # Category Filter
-    categories = st.session_state.db_manager.get_categories()
+    categories = store.get_categories()
     selected_category = st.selectbox("📂 Category", ["All"] + categories)
     
     # Dietary Filters
     dietary_options = st.multiselect("🥗 Dietary Preferences", 
                                    ["spicy", "vegetarian", "vegan", "gluten-free", "dairy-free"])
     
+    # Meal Bundles
+    with st.expander("🍱 Build a Meal Under Budget"):
+        bundle_col1, bundle_col2, bundle_col3 = st.columns(3)
+        
+        with bundle_col1:
+            bundle_budget = st.number_input("💵 Budget ($)", min_value=5.0, max_value=100.0, value=15.0, step=1.0)
+        
+        with bundle_col2:
+            bundle_max_spice = st.slider("🌶️ Max Spice", 0, 10, 10)
+        
+        with bundle_col3:
+            bundle_with_drink = st.checkbox("🥤 Include a drink", value=False)
+        
+        bundles = get_bundle_engine(catalog).solve(
+            bundle_budget,
+            top_k=3,
+            dietary=dietary_options,
+            max_spice=bundle_max_spice,
+            prices=store.price,
+            available=store.available,
+            required_roles=('drink',) if bundle_with_drink else ()
+        )
+        
+        if bundles:
+            for bundle in bundles:
+                items = " + ".join(
+                    f"{store.record(product_id).get('name')} ({role})" for role, product_id in bundle['items']
+                )
+                st.markdown(f"**${bundle['total_price']:.2f}** • {items}")
+        else:
+            st.info("🤔 No complete meal fits those constraints - try a bigger budget")
+    
     # Search Products
     search_params = {
         'limit': 1000 if results_limit == "All" else results_limit,
@@ -697,7 +872,7 @@ elif page == "🍔 Product Explorer":
     if dietary_options:
         search_params['dietary_tags'] = dietary_options
     
-    products = st.session_state.db_manager.search_products(**search_params)
+    products = store.search_products(**search_params)
     
     st.subheader(f"Found {len(products)} products")
     
@@ -743,11 +918,93 @@ elif page == "⚙️ System Status":
         else:
             st.error("❌ Offline")
     
+    # LLM Admission Queue
+    st.subheader("🚦 LLM Request Queue")
+    queue_status = llm_admission.status()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Queue Depth", queue_status['queue_depth'])
+    
+    with col2:
+        st.metric("Avg Wait", f"{queue_status['avg_wait_ms']:.0f} ms")
+    
+    with col3:
+        st.metric("P95 Wait", f"{queue_status['p95_wait_ms']:.0f} ms")
+    
+    with col4:
+        st.metric("Local Fallbacks", sum(queue_status['fallbacks'].values()))
+    
+    for provider, bucket in queue_status['buckets'].items():
+        scope = "shared" if bucket['shared'] else "this process"
+        st.text(f"{provider.title()} tokens: {bucket['available']:.1f}/{bucket['capacity']:.0f} per minute ({scope})")
+    
+    # Prompt Context Size
+    st.subheader("🧾 Prompt Context Size (estimate)")
+    prompt_metrics = list(session.prompt_context.turn_metrics)
+    
+    if prompt_metrics:
+        df = pd.DataFrame(prompt_metrics)
+        fig = px.line(df, x='turn', y=['prompt_tokens', 'summary_tokens'],
+                      title=f"Estimated Bounded-Context Tokens per Turn (budget {session.prompt_context.token_budget})",
+                      markers=True)
+        fig.update_layout(height=300)
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption("Size of the bounded context as rendered locally; the agent does not send it to the model yet.")
+    else:
+        st.info("💡 Prompt size metrics appear after the first message")
+    
+    # Local NLP Pipeline
+    st.subheader("🧠 Local NLP Pipeline")
+    nlp_status = nlp_pipeline.status()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Status", "✅ Warm" if nlp_status['ready'] else "⏳ Loading")
+    with col2:
+        st.metric("Backend", nlp_status['backend'].title())
+    with col3:
+        st.metric("Load Time", f"{nlp_status['load_ms']:.0f} ms" if nlp_status['load_ms'] is not None else "N/A")
+    with col4:
+        lookups = nlp_status['cache_hits'] + nlp_status['cache_misses']
+        hit_rate = nlp_status['cache_hits'] / lookups * 100 if lookups else 0
+        st.metric("Cache Hit Rate", f"{hit_rate:.0f}%", f"{nlp_status['cache_size']} messages cached")
+    
+    # Session Memory
+    st.subheader("🧹 Session Memory")
+    registry_stats = session_registry.stats()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("This Session", f"{session.memory_bytes() / 1024:.1f} KB")
+    
+    with col2:
+        st.metric("Live Sessions", registry_stats['live_sessions'])
+    
+    with col3:
+        st.metric("Released Sessions", registry_stats['spooled_sessions'])
+    
+    with col4:
+        rss = registry_stats['process_rss_bytes']
+        st.metric("Process Memory", f"{rss / (1024 * 1024):.0f} MB" if rss else "N/A")
+    
+    if registry_stats['sessions']:
+        sessions_df = pd.DataFrame(registry_stats['sessions']).sort_values('memory_kb', ascending=False)
+        st.dataframe(sessions_df, use_container_width=True, hide_index=True)
+    
+    memory_limit = session_registry.memory_limit_bytes
+    st.caption(f"Idle timeout: {session_registry.idle_timeout / 60:.0f} min • "
+               f"Session memory: {registry_stats['session_bytes'] / (1024 * 1024):.1f} MB"
+               f"{f' of {memory_limit / (1024 * 1024):.0f} MB' if memory_limit else ''} • "
+               f"Evictions: {registry_stats['evictions']} • Rehydrations: {registry_stats['rehydrations']}")
+    
     # Database Status
     st.subheader("☁️ MongoDB Status")
     try:
-        product_count = st.session_state.db_manager.get_products_count()
-        categories = st.session_state.db_manager.get_categories()
+        product_count = session.db_manager.get_products_count()
+        categories = session.db_manager.get_categories()
         
         col1, col2, col3 = st.columns(3)
         
@@ -765,15 +1022,40 @@ elif page == "⚙️ System Status":
     except Exception as e:
         st.error(f"Database connection error: {e}")
     
+    # Conversation Storage Tiers
+    try:
+        conversation_archive = get_conversation_archive()
+    except Exception as e:
+        conversation_archive = None
+        st.error(f"Conversation archive unavailable: {e}")
+    
+    if conversation_archive is not None:
+        st.subheader("🗄️ Conversation Storage")
+        tier_rows = [
+            {'tier': name, **{k: v for k, v in stats.items() if k != 'error'}}
+            for name, stats in conversation_archive.storage_stats().items()
+        ]
+        st.dataframe(pd.DataFrame(tier_rows), use_container_width=True, hide_index=True)
+    
+    # Query Profiling
+    if query_profiler is not None:
+        st.subheader("🔬 search_products Query Shapes")
+        shape_rows = query_profiler.summary()
+        if shape_rows:
+            st.dataframe(pd.DataFrame(shape_rows), use_container_width=True, hide_index=True)
+            st.caption("💡 Run `python -m database.query_profiler report` for index proposals")
+        else:
+            st.info("💡 No product searches profiled yet")
+    
     # System Information
     st.subheader("🔍 System Information")
     
     system_info = {
         "Python Version": f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
         "Streamlit Version": st.__version__,
-        "Session Start": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Conversation ID": st.session_state.current_conversation_id,
-        "Messages in Session": len(st.session_state.conversation_history)
+        "Session Start": datetime.fromtimestamp(session.created_at).strftime("%Y-%m-%d %H:%M:%S"),
+        "Conversation ID": session.current_conversation_id,
+        "Messages in Session": len(session.conversation_history)
     }
     
     for key, value in system_info.items():
@@ -789,3 +1071,6 @@ st.markdown("""
     <em>Real-time conversational food discovery system</em>
 </div>
 """, unsafe_allow_html=True)
+
+# The run is over; from here the session counts as idle and may be evicted
+session.end_run()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+FoodieBot Analytics Export
+Streams conversations, messages and recommendations out of MongoDB
+into date-partitioned Parquet files for BI tools
+
+Usage:
+  python export_analytics.py                       # Export new data since the last run
+  python export_analytics.py --full                # Rebuild each collection's output from scratch
+  python export_analytics.py --collections messages --batch-size 5000
+  python export_analytics.py --lag-seconds 300     # Wait longer for late inserts
+
+Incremental runs only pick up documents inserted since the last run (by _id).
+ObjectIds from different app replicas are only ordered to the second, so each run
+stops at documents older than a safety lag (EXPORT_LAG_SECONDS, default 120 s);
+anything newer is picked up by the next run. Documents updated in place afterwards
+(e.g. a conversation's interest scores or end_time) are not re-exported; run with
+--full to refresh them.
+
+When a field gains a column or changes type (conflicting types widen to string),
+the collection's existing Parquet files are rewritten with the new schema, so every
+file of a collection always shares one schema and reads as a single dataset.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import ASCENDING
+
+from database.connection import get_database
+
+# Collection -> field holding the event time used for date partitioning.
+# Documents without it are partitioned by their ObjectId creation time.
+EXPORT_COLLECTIONS = {
+    'conversations': 'start_time',
+    'messages': 'timestamp',
+    'recommendations': 'timestamp',
+}
+
+STATE_FILE = '_export_state.json'
+
+# Only documents whose _id is older than this are exported (see module docstring)
+DEFAULT_LAG_SECONDS = int(os.getenv('EXPORT_LAG_SECONDS', '120'))
+
+# Column types produced by normalize_value
+ARROW_TYPES = {
+    'bool': pa.bool_(),
+    'double': pa.float64(),
+    'string': pa.string(),
+    'timestamp': pa.timestamp('us', tz='UTC'),
+}
+
+
+def load_state(output_dir):
+    """Read the per-collection high-water marks and column schemas"""
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    # Older state files stored only the last exported _id per collection
+    return {name: {'last_id': entry} if isinstance(entry, str) else entry
+            for name, entry in state.items()}
+
+
+def save_state(output_dir, state):
+    """Write the high-water marks atomically so an interrupted run resumes cleanly"""
+    path = os.path.join(output_dir, STATE_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def normalize_value(value):
+    """Convert a BSON value into a Parquet-friendly type with a stable schema"""
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def value_type(value):
+    """Column type name for a normalized value (None for nulls)"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, float):
+        return 'double'
+    if isinstance(value, datetime):
+        return 'timestamp'
+    return 'string'
+
+
+def merge_schema(schema, rows):
+    """Add the batch's fields to a collection schema; conflicting types widen to string
+
+    Returns True when the schema changed, i.e. files already written need rewriting.
+    """
+    changed = False
+    for row in rows:
+        for key, value in row.items():
+            current = schema.get(key)
+            found = value_type(value)
+            if key not in schema:
+                schema[key] = found
+                changed = True
+            elif current is None:
+                if found is not None:
+                    schema[key] = found
+                    changed = True
+            elif found is not None and found != current and current != 'string':
+                print(f"⚠️ Field '{key}' holds both {current} and {found} values; exporting it as string")
+                schema[key] = 'string'
+                changed = True
+    return changed
+
+
+def build_table(rows, schema):
+    """Arrow table with every column of the collection schema (missing fields are null)"""
+    string_fields = [key for key, kind in schema.items() if kind == 'string']
+    coerced = []
+    for row in rows:
+        row = dict(row)
+        for key in string_fields:
+            value = row.get(key)
+            if value is not None and not isinstance(value, str):
+                row[key] = value.isoformat() if isinstance(value, datetime) else str(value)
+        coerced.append(row)
+    arrow_schema = pa.schema([(key, ARROW_TYPES[kind or 'string']) for key, kind in schema.items()])
+    return pa.Table.from_pylist(coerced, schema=arrow_schema)
+
+
+def rewrite_files(collection_dir, schema):
+    """Rewrite a collection's existing Parquet files with its current schema (one file at a time)"""
+    arrow_schema = build_table([], schema).schema
+    rewritten = 0
+    for root, _, files in os.walk(collection_dir):
+        for name in sorted(files):
+            if not name.endswith('.parquet'):
+                continue
+            path = os.path.join(root, name)
+            table = pq.read_table(path)
+            if table.schema.equals(arrow_schema):
+                continue
+            tmp_path = path + '.tmp'
+            pq.write_table(build_table(table.to_pylist(), schema), tmp_path, compression='snappy')
+            os.replace(tmp_path, path)
+            rewritten += 1
+    if rewritten:
+        print(f"🔁 Rewrote {rewritten} existing file(s) in {os.path.basename(collection_dir)} with the updated schema")
+    return rewritten
+
+
+def partition_date(document, timestamp_field):
+    """Date partition (YYYY-MM-DD) for a document"""
+    value = document.get(timestamp_field)
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return document['_id'].generation_time.strftime('%Y-%m-%d')
+
+
+def write_partitions(collection_dir, rows_by_date, schema, run_id, batch_number):
+    """Write one Parquet file per date partition for the buffered batch"""
+    changed = False
+    for rows in rows_by_date.values():
+        changed = merge_schema(schema, rows) or changed
+    if changed and os.path.isdir(collection_dir):
+        # Keep earlier files readable alongside the new ones
+        rewrite_files(collection_dir, schema)
+
+    written = 0
+    for date, rows in rows_by_date.items():
+        partition_dir = os.path.join(collection_dir, f"date={date}")
+        os.makedirs(partition_dir, exist_ok=True)
+        table = build_table(rows, schema)
+        pq.write_table(
+            table,
+            os.path.join(partition_dir, f"part-{run_id}-{batch_number:05d}.parquet"),
+            compression='snappy'
+        )
+        written += len(rows)
+    return written
+
+
+def export_collection(db, collection_name, timestamp_field, output_dir, state, batch_size, run_id, full=False,
+                      lag_seconds=DEFAULT_LAG_SECONDS):
+    """Stream one collection past its high-water mark into Parquet partitions
+
+    A full export is written to a staging directory that replaces the collection's
+    previous output only once it completes, so old part files are never double counted.
+    Documents inserted within the last lag_seconds are left for the next run.
+    """
+    collection_dir = os.path.join(output_dir, collection_name)
+    if full:
+        entry = {}
+        target_dir = os.path.join(output_dir, f".{collection_name}-full-{run_id}")
+    else:
+        entry = dict(state.get(collection_name, {}))
+        target_dir = collection_dir
+    # Columns seen in earlier files, so new files keep the same column set
+    schema = dict(entry.get('schema', {}))
+
+    id_range = {}
+    last_id = entry.get('last_id')
+    if last_id:
+        id_range['$gt'] = ObjectId(last_id)
+    if lag_seconds:
+        id_range['$lt'] = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=lag_seconds))
+    query = {'_id': id_range} if id_range else {}
+
+    # Server-side cursor ordered by _id: memory stays bounded by batch_size
+    cursor = db[collection_name].find(query, no_cursor_timeout=True).sort('_id', ASCENDING).batch_size(batch_size)
+
+    exported = 0
+    batch_number = 0
+    rows_by_date = {}
+    buffered = 0
+    try:
+        for document in cursor:
+            row = {key: normalize_value(value) for key, value in document.items()}
+            rows_by_date.setdefault(partition_date(document, timestamp_field), []).append(row)
+            buffered += 1
+            last_id = str(document['_id'])
+
+            if buffered >= batch_size:
+                exported += write_partitions(target_dir, rows_by_date, schema, run_id, batch_number)
+                if not full:
+                    state[collection_name] = {'last_id': last_id, 'schema': schema}
+                    save_state(output_dir, state)
+                rows_by_date = {}
+                buffered = 0
+                batch_number += 1
+
+        if buffered:
+            exported += write_partitions(target_dir, rows_by_date, schema, run_id, batch_number)
+    except Exception:
+        if full:
+            shutil.rmtree(target_dir, ignore_errors=True)
+        raise
+    finally:
+        cursor.close()
+
+    if full:
+        if os.path.exists(collection_dir):
+            shutil.rmtree(collection_dir)
+        if os.path.exists(target_dir):
+            os.replace(target_dir, collection_dir)
+    if last_id:
+        state[collection_name] = {'last_id': last_id, 'schema': schema}
+    else:
+        state.pop(collection_name, None)
+    save_state(output_dir, state)
+
+    return exported
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export FoodieBot analytics data to partitioned Parquet")
+    parser.add_argument('--output', default=os.getenv('ANALYTICS_EXPORT_PATH', './analytics/reports/'),
+                        help="Output directory (default: ANALYTICS_EXPORT_PATH)")
+    parser.add_argument('--collections', default=','.join(EXPORT_COLLECTIONS),
+                        help="Comma-separated collections to export")
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help="Documents per cursor batch and output file")
+    parser.add_argument('--full', action='store_true',
+                        help="Replace each collection's output with a fresh export of everything")
+    parser.add_argument('--lag-seconds', type=int, default=DEFAULT_LAG_SECONDS,
+                        help="Skip documents inserted in the last N seconds (default: EXPORT_LAG_SECONDS)")
+    args = parser.parse_args()
+
+    output_dir = os.path.join(args.output, 'parquet')
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("📦 FoodieBot Analytics Export")
+    print("=" * 40)
+
+    try:
+        db = get_database()
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return
+
+    state = load_state(output_dir)
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:6]
+
+    for collection_name in [c.strip() for c in args.collections.split(',') if c.strip()]:
+        timestamp_field = EXPORT_COLLECTIONS.get(collection_name, 'timestamp')
+        try:
+            count = export_collection(db, collection_name, timestamp_field, output_dir,
+                                      state, args.batch_size, run_id, full=args.full,
+                                      lag_seconds=args.lag_seconds)
+            label = "documents exported" if args.full else "new documents exported"
+            print(f"✅ {collection_name}: {count} {label}")
+        except Exception as e:
+            print(f"❌ {collection_name}: export failed: {e}")
+
+    print(f"\n📁 Output: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
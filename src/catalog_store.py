@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+🗂️ FoodieBot Columnar Catalog Store
+Shared, interned product catalog stored as struct-of-arrays
+
+Features:
+- One process-wide copy of the catalog shared by every session
+- NumPy columns for price, calories, spice_level and popularity_score
+- Interned strings and tuples for names, categories and tags
+- Compact __slots__ ProductRecord views instead of per-list dict copies
+- Vectorized analytics (category distribution, price bands)
+- Copy-and-swap updates: new products and periodic refreshes from MongoDB never
+  expose half-grown columns to concurrent readers
+- Refreshes only swap columns (and bump the revision) when a product actually changed;
+  products deleted from MongoDB stay as rows but are marked inactive
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fast_food_products.json')
+
+NUMERIC_COLUMNS = {
+    'price': np.float64,
+    'calories': np.int32,
+    'spice_level': np.int8,
+    'popularity_score': np.int16,
+}
+
+BOOL_COLUMNS = ('chef_special', 'limited_time')
+
+TEXT_COLUMNS = ('product_id', 'name', 'description', 'prep_time', 'image_prompt')
+
+TAG_COLUMNS = ('ingredients', 'dietary_tags', 'mood_tags', 'allergens')
+
+# Refreshes whose changed rows are remembered for incremental consumers (typeahead)
+CHANGE_HISTORY = 16
+
+FIELDS = TEXT_COLUMNS + ('category',) + tuple(NUMERIC_COLUMNS) + BOOL_COLUMNS + TAG_COLUMNS
+
+
+def _intern(value):
+    """Intern a string so repeated values share one object"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class ProductRecord:
+    """Lightweight view of one catalog row; reads fields from the shared columns"""
+
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def product_id(self):
+        return self._store.product_id[self._index]
+
+    def get(self, key, default=None):
+        """Dict-style field access so records drop into code written for product dicts"""
+        try:
+            return self._store.value(key, self._index)
+        except KeyError:
+            return default
+
+    def __getitem__(self, key):
+        return self._store.value(key, self._index)
+
+    def __contains__(self, key):
+        return key in FIELDS
+
+    def to_dict(self):
+        """Materialize the record as a plain product dict"""
+        return {field: self._store.value(field, self._index) for field in FIELDS}
+
+    def __eq__(self, other):
+        return isinstance(other, ProductRecord) and other._store is self._store and other._index == self._index
+
+    def __hash__(self):
+        return hash((id(self._store), self._index))
+
+    def __repr__(self):
+        return f"ProductRecord({self.product_id!r}, {self.get('name')!r})"
+
+
+class CatalogStore:
+    """Struct-of-arrays product catalog with an ID index"""
+
+    def __init__(self, products):
+        self._lock = threading.Lock()
+        self.categories = []
+        self._category_codes = {}
+        # Bumped when existing rows change (refresh); appends are visible through len()
+        self.revision = 0
+        # self.active: False for rows whose product has left the products collection
+        # revision -> rows changed by the refresh that produced it (recent revisions only)
+        self._changed_rows = {}
+        products = list(products)
+        self._install(self._columns(products), {p.get('product_id', ''): i for i, p in enumerate(products)})
+
+    def _columns(self, products):
+        """Build every column for a list of product dicts"""
+        columns = {}
+        for column in TEXT_COLUMNS:
+            columns[column] = [_intern(p.get(column, '')) for p in products]
+        for column in TAG_COLUMNS:
+            columns[column] = [tuple(_intern(t) for t in p.get(column, []) or []) for p in products]
+        for column, dtype in NUMERIC_COLUMNS.items():
+            columns[column] = np.array([p.get(column) or 0 for p in products], dtype=dtype)
+        for column in BOOL_COLUMNS:
+            columns[column] = np.array([bool(p.get(column)) for p in products], dtype=bool)
+        columns['category_code'] = np.array(
+            [self._code_for(p.get('category') or 'Other') for p in products], dtype=np.int16
+        )
+        columns['active'] = np.ones(len(products), dtype=bool)
+        return columns
+
+    def _install(self, columns, index):
+        """Swap in complete columns; product_id goes last, so every column is always at
+        least len(self) long for readers that don't take the lock"""
+        for column, values in columns.items():
+            if column != 'product_id':
+                setattr(self, column, values)
+        self.product_id = columns['product_id']
+        self._index = index
+
+    def _code_for(self, category):
+        """Integer code for a category name, registering it if new"""
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(_intern(category))
+            self._category_codes[category] = code
+        return code
+
+    @classmethod
+    def from_json(cls, path=CATALOG_PATH):
+        """Load the catalog from the bundled product JSON file"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_database(cls, db_manager, limit=10000):
+        """Load the catalog from the products collection, falling back to the JSON file"""
+        try:
+            products = db_manager.search_products(limit=limit)
+            if products:
+                return cls(products)
+        except Exception as e:
+            print(f"Error loading catalog from database: {e}")
+        return cls.from_json()
+
+    def __len__(self):
+        return len(self.product_id)
+
+    def value(self, field, index):
+        """Read one field of one row as a plain Python value"""
+        if field == 'category':
+            return self.categories[self.category_code[index]]
+        if field in NUMERIC_COLUMNS or field in BOOL_COLUMNS:
+            return getattr(self, field)[index].item()
+        if field in TAG_COLUMNS:
+            return list(getattr(self, field)[index])
+        if field in TEXT_COLUMNS:
+            return getattr(self, field)[index]
+        raise KeyError(field)
+
+    def category_code_of(self, category):
+        """Integer code for a category name, or None if unknown"""
+        return self._category_codes.get(category)
+
+    def index_of(self, product_id):
+        """Row index for a product ID, or None"""
+        return self._index.get(product_id)
+
+    def record(self, product_id):
+        """ProductRecord for a product ID, or None if unknown"""
+        index = self._index.get(product_id)
+        return ProductRecord(self, index) if index is not None else None
+
+    def records(self, product_ids):
+        """ProductRecords for the known IDs, in order"""
+        return [ProductRecord(self, self._index[pid]) for pid in product_ids if pid in self._index]
+
+    def _extend(self, products):
+        """Append unknown products with one copy per column (caller holds the lock)"""
+        new = {}
+        for product in products:
+            product_id = product.get('product_id')
+            if product_id is not None and product_id not in self._index:
+                new.setdefault(product_id, product)
+        if not new:
+            return 0
+        added = self._columns(list(new.values()))
+        columns = {
+            column: getattr(self, column) + values if isinstance(values, list)
+            else np.concatenate([getattr(self, column), values])
+            for column, values in added.items()
+        }
+        index = dict(self._index)
+        start = len(self.product_id)
+        index.update((product_id, start + i) for i, product_id in enumerate(new))
+        self._install(columns, index)
+        return len(new)
+
+    def ensure_many(self, products):
+        """Register product dicts missing from the catalog in one batch"""
+        if all(p.get('product_id') is None or p.get('product_id') in self._index for p in products):
+            return 0
+        with self._lock:
+            return self._extend(products)
+
+    def ensure(self, product):
+        """Register a product dict that is missing from the catalog and return its ID"""
+        self.ensure_many([product])
+        return product.get('product_id')
+
+    def refresh(self, products, complete=True):
+        """Apply the current product list: copy-and-swap only the columns whose values
+        changed and append new products. With a complete list, rows missing from it are
+        marked inactive (rows are never removed, so row indexes stay valid).
+        The revision is bumped only if an existing row changed. Returns (updated, added, removed)."""
+        products = list(products)
+        with self._lock:
+            size = len(self.product_id)
+            known = {}
+            for product in products:
+                product_id = product.get('product_id')
+                if product_id in self._index:
+                    known.setdefault(product_id, product)
+            rows = np.fromiter((self._index[pid] for pid in known), dtype=np.int64, count=len(known))
+            changed = np.zeros(size, dtype=bool)
+            columns = {}
+            for column, values in (self._columns(list(known.values())) if known else {}).items():
+                current = getattr(self, column)
+                if isinstance(values, list):
+                    differs = [current[row] != value for row, value in zip(rows, values)]
+                    if any(differs):
+                        current = list(current)
+                        for row, value, differ in zip(rows, values, differs):
+                            if differ:
+                                current[row] = value
+                                changed[row] = True
+                        columns[column] = current
+                else:
+                    differs = current[rows] != values
+                    if differs.any():
+                        current = current.copy()
+                        current[rows[differs]] = values[differs]
+                        changed[rows[differs]] = True
+                        columns[column] = current
+
+            removed = 0
+            if complete:
+                present = np.zeros(size, dtype=bool)
+                present[rows] = True
+                active = columns.get('active', self.active)
+                gone = active[:size] & ~present
+                removed = int(gone.sum())
+                if removed:
+                    active = active.copy()
+                    active[:size][gone] = False
+                    changed |= gone
+                    columns['active'] = active
+
+            updated = int(changed.sum()) - removed
+            if columns:
+                columns['product_id'] = self.product_id
+                self._install(columns, self._index)
+                self._changed_rows[self.revision + 1] = np.flatnonzero(changed)
+                self._changed_rows.pop(self.revision + 1 - CHANGE_HISTORY, None)
+                self.revision += 1
+            added = self._extend(products)
+        return updated, added, removed
+
+    def rows_changed_since(self, revision):
+        """Rows changed by refreshes after `revision`, or None if that history is gone"""
+        current = self.revision
+        if revision == current:
+            return np.zeros(0, dtype=np.int64)
+        history = [self._changed_rows.get(r) for r in range(revision + 1, current + 1)]
+        if revision > current or any(rows is None for rows in history):
+            return None
+        return np.unique(np.concatenate(history))
+
+    def refresh_from_database(self, db_manager, limit=10000):
+        """Re-read the products collection so edits and deletions reach the shared catalog without a restart"""
+        try:
+            products = db_manager.search_products(limit=limit)
+            if products:
+                # A result cut off at the limit doesn't prove the missing products were deleted
+                return self.refresh((p.to_dict() if isinstance(p, ProductRecord) else p for p in products),
+                                    complete=len(products) < limit)
+        except Exception as e:
+            print(f"Error refreshing catalog from database: {e}")
+        return 0, 0, 0
+
+    def ids_for(self, products):
+        """Product IDs for a list of product dicts or records, registering unknown products"""
+        self.ensure_many([p for p in products or [] if isinstance(p, dict)])
+        ids = []
+        for product in products or []:
+            if isinstance(product, ProductRecord):
+                ids.append(product.product_id)
+            elif isinstance(product, dict):
+                if product.get('product_id') is not None:
+                    ids.append(product['product_id'])
+            else:
+                ids.append(product)
+        return ids
+
+    def indexes_for(self, product_ids):
+        """Row indexes for product IDs as a NumPy array"""
+        return np.fromiter(
+            (self._index[pid] for pid in product_ids if pid in self._index), dtype=np.int64
+        )
+
+    def popular(self, limit=10):
+        """Most popular active products as records"""
+        size = len(self)
+        order = np.argsort(-self.popularity_score[:size], kind='stable')
+        order = order[self.active[order]][:limit]
+        return [ProductRecord(self, int(i)) for i in order]
+
+    # Vectorized analytics
+
+    def category_counts(self, product_ids=None):
+        """Category distribution over the catalog, or over a (repeating) list of product IDs"""
+        if product_ids is None:
+            size = len(self)
+            codes = self.category_code[:size][self.active[:size]]
+        else:
+            codes = self.category_code[self.indexes_for(product_ids)]
+        counts = np.bincount(codes, minlength=len(self.categories))
+        return {self.categories[i]: int(c) for i, c in enumerate(counts) if c}
+
+    def price_bands(self, edges=(0, 5, 10, 15, 20, 1000), product_ids=None):
+        """Product counts per price band"""
+        if product_ids is None:
+            size = len(self)
+            prices = self.price[:size][self.active[:size]]
+        else:
+            prices = self.price[self.indexes_for(product_ids)]
+        counts, _ = np.histogram(prices, bins=np.asarray(edges, dtype=np.float64))
+        labels = [
+            f"${edges[i]}-${edges[i + 1]}" if i < len(edges) - 2 else f"${edges[i]}+"
+            for i in range(len(edges) - 1)
+        ]
+        return dict(zip(labels, (int(c) for c in counts)))
+
+    def category_price_stats(self):
+        """Average price and product count per category"""
+        size = len(self)
+        active = self.active[:size]
+        codes = self.category_code[:size][active]
+        counts = np.bincount(codes, minlength=len(self.categories))
+        totals = np.bincount(codes, weights=self.price[:size][active], minlength=len(self.categories))
+        return {
+            self.categories[i]: {'count': int(counts[i]), 'avg_price': float(totals[i] / counts[i])}
+            for i in range(len(self.categories)) if counts[i]
+        }
+
+
+_catalog_store = None
+_catalog_lock = threading.Lock()
+_catalog_refreshed_at = 0.0
+_catalog_refreshing = False
+
+
+def _refresh_catalog(db_manager):
+    global _catalog_refreshing
+    try:
+        _catalog_store.refresh_from_database(db_manager)
+    finally:
+        _catalog_refreshing = False
+
+
+def get_catalog_store(db_manager=None):
+    """Process-wide catalog store, loaded once on first use
+
+    With a db_manager, the catalog is re-read in the background every
+    CATALOG_REFRESH_SECONDS (0 disables) so product edits show up without a restart.
+    """
+    global _catalog_store, _catalog_refreshed_at, _catalog_refreshing
+    if _catalog_store is None:
+        with _catalog_lock:
+            if _catalog_store is None:
+                if db_manager is not None:
+                    _catalog_store = CatalogStore.from_database(db_manager)
+                else:
+                    _catalog_store = CatalogStore.from_json()
+                _catalog_refreshed_at = time.time()
+
+    interval = float(os.getenv('CATALOG_REFRESH_SECONDS', '300'))
+    if db_manager is not None and interval > 0 and time.time() - _catalog_refreshed_at >= interval:
+        with _catalog_lock:
+            if not _catalog_refreshing and time.time() - _catalog_refreshed_at >= interval:
+                _catalog_refreshing = True
+                _catalog_refreshed_at = time.time()
+                threading.Thread(target=_refresh_catalog, args=(db_manager,),
+                                 name='foodiebot-catalog-refresh', daemon=True).start()
+    return _catalog_store
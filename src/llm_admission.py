@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+🚦 FoodieBot LLM Admission Control
+Process-wide rate limiting and request queueing in front of the AI providers
+
+Features:
+- Token buckets sized to each provider's requests-per-minute quota
+- Optional cross-process buckets backed by a shared SQLite file
+- Priority queue: in-flight conversations are admitted before new ones
+- Deadline-aware fast fallback when the queue wait would be too long
+- Queue-time metrics for the System Status page
+"""
+
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+PRIORITY_IN_FLIGHT = 0
+PRIORITY_NEW_CONVERSATION = 1
+
+# Order in which the agent tries providers; the first available one serves a chat turn
+PROVIDER_ORDER = ('gemini', 'groq')
+
+PRIORITY_LABELS = {
+    PRIORITY_IN_FLIGHT: "in_flight",
+    PRIORITY_NEW_CONVERSATION: "new_conversation",
+}
+
+
+class TokenBucket:
+    """In-process token bucket refilled continuously up to its capacity"""
+
+    def __init__(self, name, capacity, refill_per_second):
+        self.name = name
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, tokens, updated_at, now):
+        """Return the token count after refilling from `updated_at` to `now`"""
+        elapsed = max(0.0, now - updated_at)
+        return min(self.capacity, tokens + elapsed * self.refill_per_second)
+
+    def _seconds_until(self, tokens, needed):
+        """Seconds until `needed` tokens are available"""
+        missing = needed - tokens
+        if missing <= 0:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float('inf')
+        return missing / self.refill_per_second
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; return 0 on success or the seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = self._refill(self._tokens, self._updated_at, now)
+            self._updated_at = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return self._seconds_until(self._tokens, tokens)
+
+    def release(self, tokens=1):
+        """Return tokens taken by an acquisition that was abandoned"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def estimate_wait(self, tokens=1):
+        """Seconds until `tokens` could be taken, without taking them"""
+        with self._lock:
+            current = self._refill(self._tokens, self._updated_at, time.monotonic())
+            return self._seconds_until(current, tokens)
+
+    def available(self):
+        """Current number of tokens in the bucket"""
+        with self._lock:
+            return self._refill(self._tokens, self._updated_at, time.monotonic())
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a shared SQLite file so several processes draw from one quota"""
+
+    def __init__(self, name, capacity, refill_per_second, db_path):
+        super().__init__(name, capacity, refill_per_second)
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS token_buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "INSERT OR IGNORE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (name, self.capacity, time.time())
+            )
+
+    def _connect(self):
+        """Open a short-lived connection; autocommit so BEGIN IMMEDIATE controls locking"""
+        return sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+
+    def _update(self, fn):
+        """Run `fn(tokens, now) -> (new_tokens, result)` atomically across processes"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            now = time.time()
+            tokens = self._refill(row[0], row[1], now) if row else self.capacity
+            new_tokens, result = fn(tokens, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.name, new_tokens, now)
+            )
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def try_acquire(self, tokens=1):
+        """Take tokens from the shared bucket; return 0 on success or the seconds to wait"""
+        def take(current, now):
+            if current >= tokens:
+                return current - tokens, 0.0
+            return current, self._seconds_until(current, tokens)
+        return self._update(take)
+
+    def release(self, tokens=1):
+        """Return tokens to the shared bucket"""
+        self._update(lambda current, now: (min(self.capacity, current + tokens), None))
+
+    def available(self):
+        """Current number of tokens in the shared bucket"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return self.capacity
+        return self._refill(row[0], row[1], time.time())
+
+    def estimate_wait(self, tokens=1):
+        """Seconds until `tokens` could be taken from the shared bucket"""
+        return self._seconds_until(self.available(), tokens)
+
+
+class AdmissionMetrics:
+    """Rolling queue-time and outcome counters"""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)
+        self.admitted = {label: 0 for label in PRIORITY_LABELS.values()}
+        self.fallbacks = {label: 0 for label in PRIORITY_LABELS.values()}
+
+    def record(self, priority, waited, admitted):
+        """Record one admission decision"""
+        label = PRIORITY_LABELS.get(priority, str(priority))
+        with self._lock:
+            self._waits.append(waited)
+            counter = self.admitted if admitted else self.fallbacks
+            counter[label] = counter.get(label, 0) + 1
+
+    def snapshot(self):
+        """Summary of recent queue waits (milliseconds) and outcome counts"""
+        with self._lock:
+            waits = sorted(self._waits)
+            admitted = dict(self.admitted)
+            fallbacks = dict(self.fallbacks)
+        if waits:
+            avg_ms = sum(waits) / len(waits) * 1000
+            p95_ms = waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000
+            max_ms = waits[-1] * 1000
+        else:
+            avg_ms = p95_ms = max_ms = 0.0
+        return {
+            'samples': len(waits),
+            'avg_wait_ms': avg_ms,
+            'p95_wait_ms': p95_ms,
+            'max_wait_ms': max_ms,
+            'admitted': admitted,
+            'fallbacks': fallbacks,
+        }
+
+
+class LLMAdmissionController:
+    """Priority queue in front of the LLM providers, backed by per-provider token buckets"""
+
+    def __init__(self, buckets, default_deadline=8.0, poll_interval=0.05):
+        self.buckets = buckets
+        self.default_deadline = default_deadline
+        self.poll_interval = poll_interval
+        self.metrics = AdmissionMetrics()
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        # Bumped whenever the queue changes, so a waiter can't miss a notify sent while it was
+        # talking to the buckets outside the condition
+        self._generation = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build the controller from the environment configuration"""
+        quotas = {
+            'gemini': float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '15')),
+            'groq': float(os.getenv('GROQ_REQUESTS_PER_MINUTE', '30')),
+        }
+        db_path = os.getenv('LLM_RATE_LIMIT_DB', '').strip()
+        buckets = {}
+        for provider, per_minute in quotas.items():
+            if db_path:
+                try:
+                    buckets[provider] = SQLiteTokenBucket(provider, per_minute, per_minute / 60.0, db_path)
+                    continue
+                except Exception as e:
+                    print(f"Shared rate limit store unavailable, using in-process bucket: {e}")
+            buckets[provider] = TokenBucket(provider, per_minute, per_minute / 60.0)
+        deadline = float(os.getenv('LLM_QUEUE_DEADLINE_SECONDS', '8'))
+        return cls(buckets, default_deadline=deadline)
+
+    def queue_depth(self):
+        """Number of requests currently waiting for admission"""
+        with self._cond:
+            return len(self._waiting)
+
+    def _estimate_wait(self, providers, position):
+        """Seconds before a request at `position` in the queue could be admitted"""
+        needed = position + 1
+        return max((self.buckets[p].estimate_wait(needed) for p in providers), default=0.0)
+
+    def _try_take(self, providers):
+        """Take one token from every provider bucket or none; return 0 or the seconds to wait"""
+        taken = []
+        for provider in providers:
+            wait = self.buckets[provider].try_acquire()
+            if wait > 0:
+                for held in taken:
+                    self.buckets[held].release()
+                return wait
+            taken.append(provider)
+        return 0.0
+
+    def admit(self, providers, priority=PRIORITY_IN_FLIGHT, deadline=None):
+        """Block until every provider has capacity; return False if the deadline cannot be met"""
+        providers = [p for p in providers if p in self.buckets]
+        deadline = self.default_deadline if deadline is None else deadline
+        started = time.monotonic()
+        expires = started + deadline
+        ticket = (priority, next(self._sequence))
+        admitted = False
+
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self._generation += 1
+        try:
+            while True:
+                with self._cond:
+                    generation = self._generation
+                    position = 0 if self._waiting[0] == ticket else sorted(self._waiting).index(ticket)
+                # Bucket calls can block (the shared SQLite store waits on other processes),
+                # so they run without the condition held; only the head of the queue takes tokens
+                if position == 0:
+                    wait = self._try_take(providers)
+                    if wait == 0:
+                        admitted = True
+                        break
+                else:
+                    wait = self._estimate_wait(providers, position)
+                remaining = expires - time.monotonic()
+                if wait > remaining:
+                    break
+                with self._cond:
+                    if self._generation == generation:
+                        self._cond.wait(min(max(wait, 0.001), self.poll_interval, remaining))
+        finally:
+            with self._cond:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._generation += 1
+                self._cond.notify_all()
+
+        self.metrics.record(priority, time.monotonic() - started, admitted)
+        return admitted
+
+    def run(self, fn, fallback, providers=PROVIDER_ORDER[:1], priority=PRIORITY_IN_FLIGHT, deadline=None):
+        """Call `fn` once admitted, otherwise return `fallback()` immediately
+
+        `providers` are the buckets charged: only the provider(s) `fn` actually calls.
+        """
+        if not self.admit(providers, priority=priority, deadline=deadline):
+            return fallback()
+        return fn()
+
+    def status(self):
+        """Bucket levels, queue depth and wait metrics for display"""
+        status = self.metrics.snapshot()
+        status['queue_depth'] = self.queue_depth()
+        status['buckets'] = {
+            name: {
+                'available': bucket.available(),
+                'capacity': bucket.capacity,
+                'shared': isinstance(bucket, SQLiteTokenBucket),
+            }
+            for name, bucket in self.buckets.items()
+        }
+        return status
+
+
+def primary_provider(ai_status):
+    """Providers to charge for one chat turn: the first available in PROVIDER_ORDER
+
+    Turns the agent falls back to the next provider for (after an error) are not charged.
+    """
+    for provider in PROVIDER_ORDER:
+        if ai_status.get(f"{provider}_available"):
+            return (provider,)
+    return ()
+
+
+# Process-wide controller shared by every Streamlit session
+llm_admission = LLMAdmissionController.from_env()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+🍱 FoodieBot Meal Bundle Engine
+Precomputed "goes-with" scores and a budget-bounded bundle solver
+
+Features:
+- Category roles: main, side, drink, dessert
+- Precomputed main × side/drink/dessert compatibility blocks (mood, spice, co-recommendation)
+- Co-recommendation counts seeded from the recommendations collection, updated from
+  new recommendation baskets, and carried over when the engine is rebuilt
+- Branch-and-bound multiple-choice knapsack returning the exact top-K bundles
+  under budget, dietary and spice constraints
+- Store-aware: solves against a store's prices and availability
+
+Usage:
+  python -m src.meal_bundles --benchmark
+"""
+
+import argparse
+import heapq
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from src.catalog_store import CatalogStore, get_catalog_store
+
+CATEGORY_ROLES = {
+    'Sides & Appetizers': 'side',
+    'Beverages': 'drink',
+    'Desserts': 'dessert',
+}
+DEFAULT_ROLE = 'main'
+OPTIONAL_ROLES = ('side', 'drink', 'dessert')
+
+# Compatibility weights (each component is in [0, 1])
+MOOD_WEIGHT = 0.5
+SPICE_WEIGHT = 0.3
+CO_RECOMMENDATION_WEIGHT = 0.2
+
+# Roles that don't need to carry a dietary tag for the bundle to satisfy it
+DIETARY_EXEMPT_ROLES = {
+    'vegetarian': {'drink', 'dessert'},
+}
+
+
+class MealBundleEngine:
+    """Precomputed compatibility blocks plus a top-K bundle solver"""
+
+    def __init__(self, catalog, pair_counts=None):
+        self.catalog = catalog
+        # (main product_id, partner product_id) -> times recommended together
+        self.pair_counts = Counter(pair_counts or {})
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._build()
+
+    def _build(self):
+        """Role indexes, tag matrices and the main × role compatibility blocks"""
+        catalog = self.catalog
+        # Snapshot the row count: columns can be longer than this while the catalog grows
+        self.size = size = len(catalog)
+        self.revision = catalog.revision
+        roles = np.array([
+            CATEGORY_ROLES.get(catalog.categories[code], DEFAULT_ROLE) for code in catalog.category_code[:size]
+        ])
+        self.role_rows = {role: np.flatnonzero(roles == role) for role in (DEFAULT_ROLE,) + OPTIONAL_ROLES}
+
+        mood_tags = sorted({tag for tags in catalog.mood_tags[:size] for tag in tags})
+        mood_column = {tag: i for i, tag in enumerate(mood_tags)}
+        self.mood_matrix = np.zeros((self.size, len(mood_tags)), dtype=np.float32)
+        for row, tags in enumerate(catalog.mood_tags[:size]):
+            for tag in tags:
+                self.mood_matrix[row, mood_column[tag]] = 1.0
+
+        self.dietary_sets = [set(tags) for tags in catalog.dietary_tags[:size]]
+        self.active = catalog.active[:size].copy()
+        self.value = catalog.popularity_score[:size].astype(np.float32) / 100.0
+        self.co_counts = {role: np.zeros((len(self.role_rows[DEFAULT_ROLE]), len(self.role_rows[role])),
+                                         dtype=np.float32)
+                          for role in OPTIONAL_ROLES}
+        self._main_position = {int(row): i for i, row in enumerate(self.role_rows[DEFAULT_ROLE])}
+        self._role_position = {
+            role: {int(row): i for i, row in enumerate(self.role_rows[role])} for role in OPTIONAL_ROLES
+        }
+        for (main_id, other_id), count in self.pair_counts.items():
+            self._add_pair(catalog.index_of(main_id), catalog.index_of(other_id), count)
+        self._recompute_compatibility()
+
+    def _add_pair(self, main_row, other_row, count):
+        """Add to the dense co-recommendation block for a main/partner row pair"""
+        m = self._main_position.get(main_row)
+        if m is None:
+            return False
+        for role in OPTIONAL_ROLES:
+            p = self._role_position[role].get(other_row)
+            if p is not None:
+                self.co_counts[role][m, p] += count
+                return True
+        return False
+
+    def _recompute_compatibility(self):
+        """Dense main × role compatibility from mood overlap, spice harmony and co-recommendations"""
+        mains = self.role_rows[DEFAULT_ROLE]
+        spice = self.catalog.spice_level[:self.size].astype(np.float32)
+        main_moods = self.mood_matrix[mains]
+        main_mood_counts = main_moods.sum(axis=1, keepdims=True)
+
+        self.compatibility = {}
+        self.compatibility_row_max = {}
+        for role in OPTIONAL_ROLES:
+            rows = self.role_rows[role]
+            other_moods = self.mood_matrix[rows]
+            overlap = main_moods @ other_moods.T
+            union = main_mood_counts + other_moods.sum(axis=1) - overlap
+            mood = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+
+            spice_harmony = 1.0 - np.abs(spice[mains][:, None] - spice[rows][None, :]) / 10.0
+
+            counts = self.co_counts[role]
+            # A role can be empty (e.g. no category maps to it in this catalog)
+            peak = counts.max() if counts.size else 0
+            co_rec = counts / peak if peak > 0 else counts
+
+            self.compatibility[role] = (
+                MOOD_WEIGHT * mood + SPICE_WEIGHT * spice_harmony + CO_RECOMMENDATION_WEIGHT * co_rec
+            ).astype(np.float32)
+            self.compatibility_row_max[role] = (
+                self.compatibility[role].max(axis=1) if len(rows) else np.zeros(len(mains), dtype=np.float32)
+            )
+
+    def record_baskets(self, baskets):
+        """Count main/other pairs recommended together (baskets are lists of product IDs)"""
+        updated = False
+        with self._lock:
+            for basket in baskets:
+                rows = {pid: self.catalog.index_of(pid) for pid in set(basket)}
+                mains = [pid for pid, row in rows.items() if row in self._main_position]
+                for main_id in mains:
+                    for other_id, other_row in rows.items():
+                        if other_id != main_id and self._add_pair(rows[main_id], other_row, 1):
+                            self.pair_counts[(main_id, other_id)] += 1
+                            updated = True
+            # Recomputed lazily on the next solve so logging stays cheap
+            self._dirty = self._dirty or updated
+
+    def _eligible(self, rows, role, dietary, max_spice, prices, available, budget):
+        """Mask of rows in a role that satisfy the constraints on their own"""
+        mask = (prices[rows] <= budget) & self.active[rows]
+        if available is not None:
+            mask &= available[rows]
+        if max_spice is not None:
+            mask &= self.catalog.spice_level[rows] <= max_spice
+        for tag in dietary or ():
+            if role in DIETARY_EXEMPT_ROLES.get(tag, ()):
+                continue
+            mask &= np.fromiter((tag in self.dietary_sets[r] for r in rows), dtype=bool, count=len(rows))
+        return mask
+
+    def solve(self, budget, top_k=5, dietary=None, max_spice=None, prices=None, available=None,
+              required_roles=(), max_per_main=2):
+        """Top-K bundles (one main plus optional side/drink/dessert) within the budget
+
+        Exact: no main contributes more than `max_per_main` bundles, and within that
+        limit no omitted bundle scores higher than the K-th returned one.
+        Returns [{'score', 'total_price', 'items': [(role, product_id)]}], best first.
+        """
+        if self._dirty:
+            with self._lock:
+                if self._dirty:
+                    self._recompute_compatibility()
+                    self._dirty = False
+
+        prices = self.catalog.price if prices is None else prices
+        # A store view built before the catalog grew covers fewer rows; newer products
+        # take the base price and count as unavailable there
+        if len(prices) < self.size:
+            prices = np.concatenate([prices, self.catalog.price[len(prices):self.size]])
+        if available is not None and len(available) < self.size:
+            available = np.concatenate([available, np.zeros(self.size - len(available), dtype=bool)])
+        mains = self.role_rows[DEFAULT_ROLE]
+        main_mask = self._eligible(mains, DEFAULT_ROLE, dietary, max_spice, prices, available, budget)
+        main_positions = np.flatnonzero(main_mask)
+        if not len(main_positions):
+            return []
+
+        # Per-role candidates that fit the budget on their own
+        role_candidates = {}
+        for role in OPTIONAL_ROLES:
+            rows = self.role_rows[role]
+            mask = self._eligible(rows, role, dietary, max_spice, prices, available, budget)
+            role_candidates[role] = np.flatnonzero(mask)
+            if role in required_roles and not len(role_candidates[role]):
+                return []
+
+        # Optimistic bound per main: its value plus, in every role, its best compatibility
+        # and the best value among partners it can still afford
+        main_rows = mains[main_positions]
+        remaining = budget - prices[main_rows]
+        bounds = self.value[main_rows].copy()
+        for role in OPTIONAL_ROLES:
+            candidates = role_candidates[role]
+            if not len(candidates):
+                continue
+            rows = self.role_rows[role][candidates]
+            by_price = np.argsort(prices[rows], kind='stable')
+            sorted_prices = prices[rows][by_price]
+            best_value_upto = np.maximum.accumulate(self.value[rows][by_price])
+            affordable = np.searchsorted(sorted_prices, remaining, side='right')
+            has_partner = affordable > 0
+            best_value = np.where(has_partner, best_value_upto[np.maximum(affordable - 1, 0)], 0)
+            bounds += np.where(has_partner, self.compatibility_row_max[role][main_positions] + best_value, 0)
+
+        results = []  # min-heap of (score, tiebreak, bundle)
+        counter = 0
+        for order in np.argsort(-bounds):
+            if len(results) >= top_k and bounds[order] <= results[0][0]:
+                break  # no remaining main can beat the current K-th bundle
+            position = int(main_positions[order])
+            main_row = int(mains[position])
+            per_main = self._solve_main(position, main_row, budget, prices, role_candidates,
+                                        required_roles, max_per_main, results[0][0] if len(results) >= top_k else -np.inf)
+            for score, total_price, items in per_main:
+                counter += 1
+                entry = (score, counter, {'score': float(score), 'total_price': round(float(total_price), 2), 'items': items})
+                if len(results) < top_k:
+                    heapq.heappush(results, entry)
+                elif score > results[0][0]:
+                    heapq.heapreplace(results, entry)
+
+        return [entry[2] for entry in sorted(results, key=lambda e: (-e[0], e[1]))]
+
+    def _solve_main(self, position, main_row, budget, prices, role_candidates, required_roles, limit, floor):
+        """Best partner combinations for one main via depth-first branch and bound"""
+        remaining = budget - float(prices[main_row])
+        base_score = float(self.value[main_row])
+
+        # Per role: affordable candidates sorted by gain. An item that at least `limit` others
+        # beat on both price and gain can't be in this main's top `limit` bundles (swapping in
+        # each of those gives `limit` better ones), so only the rest are searched.
+        options = []
+        for role in OPTIONAL_ROLES:
+            candidates = role_candidates[role]
+            rows = self.role_rows[role][candidates]
+            gains = self.compatibility[role][position, candidates] + self.value[rows]
+            role_prices = prices[rows]
+            keep = role_prices <= remaining
+            rows, gains, role_prices = rows[keep], gains[keep], role_prices[keep]
+            frontier = []
+            top_gains = []  # min-heap of the `limit` best gains among cheaper items
+            for i in np.lexsort((-gains, role_prices)):
+                gain = float(gains[i])
+                if len(top_gains) < limit or gain > top_gains[0]:
+                    frontier.append((gain, float(role_prices[i]), int(rows[i])))
+                    if len(top_gains) < limit:
+                        heapq.heappush(top_gains, gain)
+                    else:
+                        heapq.heapreplace(top_gains, gain)
+            frontier.sort(key=lambda option: -option[0])
+            options.append((role, frontier))
+
+        max_rest = [0.0] * (len(options) + 1)
+        for i in range(len(options) - 1, -1, -1):
+            best = options[i][1][0][0] if options[i][1] else 0.0
+            max_rest[i] = max_rest[i + 1] + max(best, 0.0)
+
+        found = []  # min-heap of (score, tiebreak, total_price, items)
+        counter = [0]
+
+        def search(depth, score, spent, items):
+            current_floor = found[0][0] if len(found) >= limit else floor
+            if score + max_rest[depth] <= current_floor:
+                return
+            if depth == len(options):
+                counter[0] += 1
+                entry = (score, counter[0], float(prices[main_row]) + spent, list(items))
+                if len(found) < limit:
+                    heapq.heappush(found, entry)
+                elif score > found[0][0]:
+                    heapq.heapreplace(found, entry)
+                return
+            role, frontier = options[depth]
+            for gain, price, row in frontier:
+                current_floor = found[0][0] if len(found) >= limit else floor
+                if score + gain + max_rest[depth + 1] <= current_floor:
+                    break  # options are sorted by gain; none of the rest can do better
+                if spent + price <= remaining:
+                    items.append((role, self.catalog.product_id[row]))
+                    search(depth + 1, score + gain, spent + price, items)
+                    items.pop()
+            if role not in required_roles:
+                search(depth + 1, score, spent, items)
+
+        search(0, base_score, 0.0, [(DEFAULT_ROLE, self.catalog.product_id[main_row])])
+        return [(score, total, items) for score, _, total, items in found]
+
+
+def baskets_from_recommendations(documents):
+    """Group logged recommendation documents into baskets of product IDs
+
+    Accepts documents carrying a `product_ids` list, or one `product_id` each; the
+    latter are grouped by (conversation_id, message_id or timestamp).
+    """
+    grouped = {}
+    for doc in documents:
+        if isinstance(doc.get('product_ids'), list):
+            yield [str(pid) for pid in doc['product_ids']]
+        elif doc.get('product_id'):
+            key = (doc.get('conversation_id'), doc.get('message_id', doc.get('timestamp')))
+            grouped.setdefault(key, []).append(str(doc['product_id']))
+    yield from grouped.values()
+
+
+def seed_from_recommendations(limit=None):
+    """Replay the most recent logged recommendations into the shared engine's counts"""
+    limit = limit or int(os.getenv('BUNDLE_SEED_LIMIT', '50000'))
+    try:
+        from database.connection import get_database
+        cursor = get_database()['recommendations'].find(
+            {}, {'_id': 0, 'product_ids': 1, 'product_id': 1, 'conversation_id': 1,
+                 'message_id': 1, 'timestamp': 1}
+        ).sort('_id', -1).limit(limit)
+        baskets = [basket for basket in baskets_from_recommendations(cursor) if len(basket) > 1]
+        (_bundle_engine or get_bundle_engine()).record_baskets(baskets)
+        print(f"🍱 Seeded bundle co-recommendations from {len(baskets)} logged baskets")
+    except Exception as e:
+        print(f"Error seeding bundle co-recommendations: {e}")
+
+
+_bundle_engine = None
+_bundle_lock = threading.Lock()
+
+
+def _engine_stale(catalog):
+    """True if the shared engine is missing or built from an older catalog state"""
+    engine = _bundle_engine
+    return (engine is None or engine.catalog is not catalog or engine.size != len(catalog)
+            or engine.revision != catalog.revision)
+
+
+def get_bundle_engine(catalog=None):
+    """Process-wide bundle engine, rebuilt (keeping its co-recommendation counts) when the catalog grows or is refreshed
+
+    The first build replays logged recommendations in the background unless
+    BUNDLE_SEED_RECOMMENDATIONS is disabled.
+    """
+    global _bundle_engine
+    catalog = catalog or get_catalog_store()
+    if _engine_stale(catalog):
+        with _bundle_lock:
+            if _engine_stale(catalog):
+                first_build = _bundle_engine is None
+                pair_counts = None
+                if not first_build:
+                    with _bundle_engine._lock:
+                        pair_counts = dict(_bundle_engine.pair_counts)
+                _bundle_engine = MealBundleEngine(catalog, pair_counts)
+                if first_build and os.getenv('BUNDLE_SEED_RECOMMENDATIONS', 'true').lower() in ('1', 'true', 'yes'):
+                    threading.Thread(target=seed_from_recommendations, name='foodiebot-bundle-seed',
+                                     daemon=True).start()
+    return _bundle_engine
+
+
+def synthetic_catalog(num_products, seed=11):
+    """Catalog of `num_products` items cloned from the bundled products with varied prices"""
+    rng = np.random.default_rng(seed)
+    seed_catalog = CatalogStore.from_json()
+    products = []
+    for i in range(num_products):
+        product = seed_catalog.record(seed_catalog.product_id[i % len(seed_catalog)]).to_dict()
+        product['product_id'] = f"B{i:06d}"
+        product['price'] = round(float(rng.uniform(1.5, 20)), 2)
+        product['popularity_score'] = int(rng.integers(1, 100))
+        products.append(product)
+    return CatalogStore(products)
+
+
+def benchmark(sizes=(100, 500, 1000, 2000, 5000), budget=15.0, rounds=20):
+    """Build and solve latency against catalog size"""
+    print("🍱 Meal bundle engine benchmark")
+    print(f"{'products':>9} {'build ms':>10} {'solve ms':>10} {'+veg/spice ms':>14}")
+    for size in sizes:
+        catalog = synthetic_catalog(size)
+        started = time.perf_counter()
+        engine = MealBundleEngine(catalog)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            engine.solve(budget, top_k=5)
+        solve_ms = (time.perf_counter() - started) / rounds * 1000
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            engine.solve(budget, top_k=5, dietary=['vegetarian'], max_spice=3)
+        constrained_ms = (time.perf_counter() - started) / rounds * 1000
+        print(f"{size:>9} {build_ms:>10.1f} {solve_ms:>10.2f} {constrained_ms:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meal bundle engine utilities")
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+🧠 FoodieBot Local NLP Pipeline
+Process-wide tokenization, sentiment and interest-signal extraction
+
+Features:
+- NLTK / TextBlob resources loaded once per process, in the background at startup
+- Memoized preprocessing keyed on message text, shared by every session
+- Interest-score factors (preferences, mood, questions, order intent, hesitation, ...)
+- Batch API for scoring many messages at once
+- Lightweight regex/lexicon fallback when NLTK or TextBlob are unavailable
+
+Usage:
+  python -m src.nlp_pipeline --benchmark
+"""
+
+import argparse
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+from src.prompt_context import DIETARY_KEYWORDS, MOOD_KEYWORDS, SPICE_KEYWORDS
+
+# Interest-score factor weights (see README: Interest Scoring Factors)
+FACTOR_WEIGHTS = {
+    'specific_preferences': 15,
+    'dietary_restrictions': 10,
+    'mood_indication': 20,
+    'question_asking': 10,
+    'order_intent': 30,
+    'positive_sentiment': 5,
+    'hesitation': -10,
+    'budget_concern': -15,
+    'dietary_conflict': -20,
+    'rejection': -25,
+    'negative_sentiment': -5,
+}
+
+ORDER_INTENT_PHRASES = ('i want', "i'll take", 'i will take', "i'll have", 'i will have', 'order', 'add to',
+                        'give me', 'sounds perfect', "let's do", 'i need')
+HESITATION_PHRASES = ('maybe', 'not sure', 'hmm', 'i guess', 'perhaps', 'possibly', 'let me think')
+BUDGET_CONCERN_PHRASES = ('expensive', 'too much', 'cheaper', 'pricey', 'cost less', 'afford')
+REJECTION_PHRASES = ("don't like", 'do not like', 'hate', 'no thanks', 'something else', 'gross')
+CONFLICT_PHRASES = ('allergic', 'allergy', "can't eat", 'cannot eat', 'intolerant')
+FOOD_WORDS = ('burger', 'pizza', 'chicken', 'taco', 'wrap', 'salad', 'fries', 'wings', 'dessert', 'drink',
+              'shake', 'coffee', 'breakfast', 'sandwich', 'nachos', 'burrito', 'cheese', 'bbq')
+
+
+def _phrase_pattern(phrases, suffix=r"\b"):
+    """One compiled pattern matching any of the phrases on word boundaries"""
+    alternatives = "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives}){suffix}")
+
+
+# Factor patterns, compiled once; phrases match whole words ("order" not in "border")
+_FOOD_PATTERN = _phrase_pattern(FOOD_WORDS, suffix=r"(?:e?s)?\b")
+_SPICE_PATTERN = _phrase_pattern(SPICE_KEYWORDS)
+_DIETARY_PATTERN = _phrase_pattern(DIETARY_KEYWORDS)
+# Mood keywords include stems ('energ', 'indulg'), so they match at the start of a word
+_MOOD_PATTERN = _phrase_pattern(MOOD_KEYWORDS, suffix="")
+_QUESTION_START = re.compile(r"^\W*(?:what|which|how|do you|can|is)\b")
+_ORDER_INTENT_PATTERN = _phrase_pattern(ORDER_INTENT_PHRASES)
+_HESITATION_PATTERN = _phrase_pattern(HESITATION_PHRASES)
+_BUDGET_CONCERN_PATTERN = _phrase_pattern(BUDGET_CONCERN_PHRASES)
+_CONFLICT_PATTERN = _phrase_pattern(CONFLICT_PHRASES)
+# "Not that (one)." rejects an item; "not that hungry" doesn't
+_REJECTION_PATTERN = re.compile(
+    _phrase_pattern(REJECTION_PHRASES).pattern + r"|\bnot (?:that|this)(?: one)?(?=\s*(?:[.!,;]|$))"
+)
+
+STOPWORDS = frozenset("""
+a an the and or but if so to of in on at for with about is are was were be been am i me my we you your
+it its this that these those some any something can could would should will just really very please want
+like get have has had do does did not no
+""".split())
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9$][a-z0-9'.$-]*")
+
+# Positive/negative cue words for the fallback sentiment scorer
+_POSITIVE_WORDS = frozenset('love great awesome amazing perfect delicious yum yummy good nice tasty excellent'.split())
+_NEGATIVE_WORDS = frozenset('hate bad awful gross terrible boring bland disgusting worst meh'.split())
+
+PreprocessedMessage = namedtuple(
+    'PreprocessedMessage', ['tokens', 'keywords', 'polarity', 'subjectivity', 'factors', 'score_delta']
+)
+
+
+class NLPPipeline:
+    """Loads NLP resources once and serves cached per-message analysis"""
+
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self.backend = 'fallback'
+        self.load_seconds = None
+        self._tokenize = None
+        self._sentiment = None
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self._warm_thread = None
+        self._cached = lru_cache(maxsize=cache_size)(self._analyze)
+
+    def load(self):
+        """Load tokenizer and sentiment analyzer (idempotent, thread-safe)"""
+        if self._loaded.is_set():
+            return
+        with self._load_lock:
+            if self._loaded.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                import nltk
+                from textblob import TextBlob
+
+                for resource, path in (('punkt', 'tokenizers/punkt'),):
+                    try:
+                        nltk.data.find(path)
+                    except LookupError:
+                        if os.getenv('NLTK_AUTO_DOWNLOAD', 'true').lower() in ('1', 'true', 'yes'):
+                            nltk.download(resource, quiet=True)
+
+                try:
+                    nltk.word_tokenize("warm up")
+                    self._tokenize = lambda text: [t.lower() for t in nltk.word_tokenize(text)]
+                except LookupError:
+                    self._tokenize = None
+
+                # The first TextBlob sentiment call loads its lexicon; pay that cost here
+                TextBlob("This burger is great").sentiment
+                self._sentiment = lambda text: tuple(TextBlob(text).sentiment)
+                self.backend = 'textblob'
+            except Exception as e:
+                print(f"NLP libraries unavailable, using lightweight fallback: {e}")
+                self.backend = 'fallback'
+            self.load_seconds = time.perf_counter() - started
+            self._loaded.set()
+
+    def warm_up(self, background=True):
+        """Load resources at startup, by default on a background thread"""
+        if self._loaded.is_set():
+            return
+        if not background:
+            if self._warm_thread is not None:
+                self._warm_thread.join()
+            self.load()
+            return
+        if self._warm_thread is not None:
+            return
+        self._warm_thread = threading.Thread(target=self.load, name='foodiebot-nlp-warmup', daemon=True)
+        self._warm_thread.start()
+
+    @property
+    def ready(self):
+        return self._loaded.is_set()
+
+    def _tokens(self, text):
+        if self._tokenize is not None:
+            return [t for t in self._tokenize(text) if _TOKEN_PATTERN.fullmatch(t)]
+        return _TOKEN_PATTERN.findall(text.lower())
+
+    def _fallback_sentiment(self, tokens):
+        positive = sum(1 for t in tokens if t in _POSITIVE_WORDS)
+        negative = sum(1 for t in tokens if t in _NEGATIVE_WORDS)
+        total = positive + negative
+        polarity = (positive - negative) / total if total else 0.0
+        return polarity, min(1.0, total / max(1, len(tokens)) * 3)
+
+    def preprocess(self, text):
+        """Tokens, keywords, sentiment and interest factors for one message (memoized)"""
+        if not self._loaded.is_set():
+            # Don't stall the message path on a cold start; answer from the fallback
+            # (uncached) until the background load finishes
+            self.warm_up()
+            return self._analyze(text, use_libraries=False)
+        return self._cached(text)
+
+    def _analyze(self, text, use_libraries=True):
+        lowered = text.lower().replace('\u2019', "'")
+        tokens = self._tokens(text) if use_libraries else _TOKEN_PATTERN.findall(lowered)
+        keywords = tuple(dict.fromkeys(t for t in tokens if t not in STOPWORDS and len(t) > 2))
+
+        if use_libraries and self._sentiment is not None:
+            polarity, subjectivity = self._sentiment(text)
+        else:
+            polarity, subjectivity = self._fallback_sentiment(tokens)
+
+        factors = {
+            'specific_preferences': bool(_FOOD_PATTERN.search(lowered) or _SPICE_PATTERN.search(lowered)),
+            'dietary_restrictions': bool(_DIETARY_PATTERN.search(lowered)),
+            'mood_indication': bool(_MOOD_PATTERN.search(lowered)),
+            'question_asking': '?' in text or bool(_QUESTION_START.match(lowered)),
+            'order_intent': bool(_ORDER_INTENT_PATTERN.search(lowered)),
+            'positive_sentiment': polarity > 0.3,
+            'hesitation': bool(_HESITATION_PATTERN.search(lowered)),
+            # Stating a budget ("under $15") is a preference; only price complaints count
+            'budget_concern': bool(_BUDGET_CONCERN_PATTERN.search(lowered)),
+            'dietary_conflict': bool(_CONFLICT_PATTERN.search(lowered)),
+            'rejection': bool(_REJECTION_PATTERN.search(lowered)),
+            'negative_sentiment': polarity < -0.3,
+        }
+        score_delta = sum(FACTOR_WEIGHTS[name] for name, present in factors.items() if present)
+        # Results are shared through the cache, so hand out a read-only view of the factors
+        return PreprocessedMessage(tuple(tokens), keywords, float(polarity), float(subjectivity),
+                                   MappingProxyType(factors), score_delta)
+
+    def score_messages(self, texts):
+        """Analyze many messages at once; duplicates are computed once"""
+        unique = {text: self.preprocess(text) for text in dict.fromkeys(texts)}
+        return [unique[text] for text in texts]
+
+    def active_factors(self, text):
+        """Names of the interest factors present in a message"""
+        return [name for name, present in self.preprocess(text).factors.items() if present]
+
+    def status(self):
+        """Backend, load time and cache statistics for display"""
+        info = self._cached.cache_info()
+        return {
+            'ready': self.ready,
+            'backend': self.backend,
+            'load_ms': self.load_seconds * 1000 if self.load_seconds is not None else None,
+            'cache_hits': info.hits,
+            'cache_misses': info.misses,
+            'cache_size': info.currsize,
+        }
+
+
+# Process-wide pipeline shared by every Streamlit session
+nlp_pipeline = NLPPipeline(cache_size=int(os.getenv('NLP_CACHE_SIZE', '4096')))
+
+
+def benchmark(rounds=2000):
+    """Per-message interest-scoring cost: cold load, uncached, cached and batch"""
+    samples = [
+        "I want something spicy and under $15",
+        "Do you have vegetarian options?",
+        "Hmm, maybe something lighter, that looks too expensive",
+        "I'm in the mood for comfort food, a big cheesy burger",
+        "I'll take the Korean BBQ tacos please!",
+        "I don't like mushrooms, something else?",
+    ]
+    pipeline = NLPPipeline()
+
+    started = time.perf_counter()
+    pipeline.load()
+    print(f"🧠 Backend: {pipeline.backend}; one-time load {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    started = time.perf_counter()
+    for i in range(rounds):
+        pipeline._analyze(f"{samples[i % len(samples)]} #{i}", use_libraries=True)
+    print(f"  Uncached interest scoring: {(time.perf_counter() - started) / rounds * 1e6:8.1f} µs/message")
+
+    started = time.perf_counter()
+    for i in range(rounds):
+        pipeline.preprocess(samples[i % len(samples)])
+    print(f"  Cached interest scoring:   {(time.perf_counter() - started) / rounds * 1e6:8.1f} µs/message")
+
+    batch = [samples[i % len(samples)] + f" #{i % 200}" for i in range(rounds)]
+    started = time.perf_counter()
+    pipeline.score_messages(batch)
+    print(f"  Batch of {rounds} (200 unique): {(time.perf_counter() - started) * 1000:8.1f} ms total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local NLP pipeline utilities")
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
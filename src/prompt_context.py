@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+🧾 FoodieBot Prompt Context Compaction
+Builds a bounded prompt context as conversations grow
+
+Features:
+- Rolling summary of turns that fall out of the recent window
+- Structured preference state (dietary, budget, mood, spice)
+- Only the last few raw messages are kept verbatim
+- Token-budget enforcement with per-turn prompt size metrics
+
+Instrumentation only for now: the agent (MongoDBEnhancedFoodieBotAgent) still builds
+its own prompt, and nothing sends render() to the LLM. The metrics show what the
+bounded context would cost; LLM latency is unchanged until the agent uses it.
+"""
+
+import re
+from collections import deque
+
+DIETARY_KEYWORDS = {
+    'vegetarian': 'vegetarian',
+    'veggie': 'vegetarian',
+    'vegan': 'vegan',
+    'gluten-free': 'gluten-free',
+    'gluten free': 'gluten-free',
+    'dairy-free': 'dairy-free',
+    'dairy free': 'dairy-free',
+    'no meat': 'vegetarian',
+}
+
+MOOD_KEYWORDS = {
+    'comfort': 'comfort',
+    'cozy': 'comfort',
+    'adventurous': 'adventurous',
+    'try something new': 'adventurous',
+    'energ': 'energizing',
+    'healthy': 'healthy',
+    'light': 'healthy',
+    'indulg': 'indulgent',
+    'treat': 'indulgent',
+    'starving': 'satisfying',
+    'hungry': 'satisfying',
+}
+
+# Checked in order, so negations come before the plain keywords
+SPICE_KEYWORDS = {
+    'not spicy': 'mild',
+    'no spice': 'mild',
+    'mild': 'mild',
+    'extra spicy': 'hot',
+    'very spicy': 'hot',
+    'spicy': 'spicy',
+}
+
+# A dollar amount only counts as a budget after a qualifier ("I paid $40" is not one)
+BUDGET_PATTERN = re.compile(
+    r'\b(?:under|below|less than|no more than|at most|max|budget of|budget is|up to)\s*\$\s*(\d+(?:\.\d{1,2})?)',
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) used for budget enforcement"""
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+
+def _truncate_to_tokens(text, max_tokens):
+    """Cut text down so that estimate_tokens(text) <= max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    max_chars = max_tokens * 4 - 1
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 3)].rstrip() + "..."
+
+
+def _as_list(value):
+    """Intent fields may hold a single string or a list of them"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+class PromptContext:
+    """Bounded conversation context: summary + preference state + recent raw messages"""
+
+    def __init__(self, max_recent_messages=6, token_budget=800, summary_token_budget=200, metrics_window=100):
+        self.max_recent_messages = max_recent_messages
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.recent = deque()
+        self.summary_points = deque()
+        self.preferences = {
+            'dietary': [],
+            'budget': None,
+            'mood': None,
+            'spice': None,
+            'cravings': [],
+        }
+        self.turn = 0
+        self.turn_metrics = deque(maxlen=metrics_window)
+
+    def add_message(self, sender, message, ai_intent=None):
+        """Add a message, updating preferences and folding old messages into the summary"""
+        if sender == 'user':
+            self.turn += 1
+            self._update_preferences(message, ai_intent)
+
+        self.recent.append((sender, message))
+        while len(self.recent) > self.max_recent_messages:
+            self._fold_into_summary(*self.recent.popleft())
+
+    def _update_preferences(self, message, ai_intent):
+        """Extract structured preferences from the message and any AI intent"""
+        text = message.lower()
+        prefs = self.preferences
+
+        for keyword, tag in DIETARY_KEYWORDS.items():
+            if keyword in text and tag not in prefs['dietary']:
+                prefs['dietary'].append(tag)
+
+        for keyword, mood in MOOD_KEYWORDS.items():
+            if keyword in text:
+                prefs['mood'] = mood
+                break
+
+        for keyword, spice in SPICE_KEYWORDS.items():
+            if keyword in text:
+                prefs['spice'] = spice
+                break
+
+        budget_match = BUDGET_PATTERN.search(message)
+        if budget_match:
+            prefs['budget'] = float(budget_match.group(1))
+
+        if ai_intent:
+            for tag in _as_list(ai_intent.get('dietary_preferences')):
+                if tag not in prefs['dietary']:
+                    prefs['dietary'].append(tag)
+            for craving in _as_list(ai_intent.get('food_preferences')):
+                if craving not in prefs['cravings']:
+                    prefs['cravings'].append(craving)
+            prefs['cravings'] = prefs['cravings'][-5:]
+
+    def _fold_into_summary(self, sender, message):
+        """Compress a message that left the recent window into a summary point"""
+        speaker = "Customer" if sender == 'user' else "FoodieBot"
+        first_sentence = re.split(r'(?<=[.!?])\s', message.strip(), maxsplit=1)[0]
+        self.summary_points.append(f"{speaker}: {_truncate_to_tokens(first_sentence, 25)}")
+
+        # Drop the oldest points once the summary outgrows its budget
+        while self.summary_points and estimate_tokens(self.summary()) > self.summary_token_budget:
+            self.summary_points.popleft()
+
+    def summary(self):
+        """Rolling summary of older turns"""
+        return " | ".join(self.summary_points)
+
+    def preference_text(self):
+        """Preference state rendered as a single line"""
+        prefs = self.preferences
+        parts = []
+        if prefs['dietary']:
+            parts.append(f"dietary: {', '.join(prefs['dietary'])}")
+        if prefs['budget'] is not None:
+            parts.append(f"budget: under ${prefs['budget']:.2f}")
+        if prefs['mood']:
+            parts.append(f"mood: {prefs['mood']}")
+        if prefs['spice']:
+            parts.append(f"spice: {prefs['spice']}")
+        if prefs['cravings']:
+            parts.append(f"cravings: {', '.join(prefs['cravings'])}")
+        return "; ".join(parts) if parts else "none stated yet"
+
+    def render(self):
+        """Build the prompt context within the token budget and record its size"""
+        header = f"Customer preferences: {self.preference_text()}"
+        summary = self.summary()
+        messages = [
+            f"{'Customer' if sender == 'user' else 'FoodieBot'}: {message}"
+            for sender, message in self.recent
+        ]
+
+        def assemble():
+            sections = [header]
+            if summary:
+                sections.append(f"Earlier in conversation: {summary}")
+            if messages:
+                sections.append("Recent messages:\n" + "\n".join(messages))
+            return "\n".join(sections)
+
+        context = assemble()
+
+        # Enforce the budget: drop older raw messages, then shorten the summary,
+        # then truncate whatever single message is left
+        while estimate_tokens(context) > self.token_budget and len(messages) > 1:
+            messages.pop(0)
+            context = assemble()
+        if estimate_tokens(context) > self.token_budget and summary:
+            summary = _truncate_to_tokens(summary, max(0, self.token_budget // 4))
+            context = assemble()
+        if estimate_tokens(context) > self.token_budget:
+            context = _truncate_to_tokens(context, self.token_budget)
+
+        self.turn_metrics.append({
+            'turn': self.turn,
+            'prompt_tokens': estimate_tokens(context),
+            'summary_tokens': estimate_tokens(summary),
+            'recent_messages': len(messages),
+        })
+        return context
+
+    def last_prompt_tokens(self):
+        """Prompt size of the most recent render"""
+        return self.turn_metrics[-1]['prompt_tokens'] if self.turn_metrics else 0
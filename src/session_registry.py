@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+🧹 FoodieBot Session Registry
+Process-wide ownership of per-session state with idle eviction
+
+Features:
+- Heavy session state (agent, DB manager, history) lives here, keyed by a session token
+- Per-session memory accounting for the System Status page
+- Background reaper persists and releases idle sessions, closing their DB clients
+- Memory-budget eviction of least recently used sessions
+- Transparent rehydration when an evicted user comes back
+"""
+
+import gc
+import os
+import pickle
+import sys
+import threading
+import time
+import types
+
+# Session fields written to the spool on eviction; everything else is rebuilt on return
+PERSISTED_FIELDS = (
+    'conversation_history',
+    'total_recommendations',
+    'current_conversation_id',
+    'prompt_context',
+)
+
+# A run that never reported its end (exception, st.stop) stops protecting its session after this
+MAX_RUN_SECONDS = 600
+
+_SKIP_TYPES = (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj, max_depth=6, _seen=None, _depth=0):
+    """Approximate retained size of an object graph in bytes"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or isinstance(obj, _SKIP_TYPES) or _depth > max_depth:
+        return 0
+    _seen.add(id(obj))
+
+    try:
+        size = sys.getsizeof(obj)
+    except TypeError:
+        return 0
+
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, max_depth, _seen, _depth + 1)
+            size += deep_sizeof(value, max_depth, _seen, _depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)) or type(obj).__name__ == 'deque':
+        for item in obj:
+            size += deep_sizeof(item, max_depth, _seen, _depth + 1)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), max_depth, _seen, _depth + 1)
+    elif hasattr(obj, '__slots__'):
+        for slot in obj.__slots__:
+            if hasattr(obj, slot):
+                size += deep_sizeof(getattr(obj, slot), max_depth, _seen, _depth + 1)
+    return size
+
+
+def process_rss_bytes():
+    """Current resident set size of this process, or None if unavailable"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except Exception:
+        return None
+
+
+def close_resource(resource):
+    """Close a session-owned resource (e.g. a pymongo client) if it can be closed"""
+    if resource is None:
+        return
+    closed = False
+    close = getattr(resource, 'close', None)
+    if callable(close):
+        close()
+        closed = True
+    # Managers that don't expose close() usually hold the client on an attribute
+    for attr in ('client', 'mongo_client', 'db_manager'):
+        inner = getattr(resource, attr, None)
+        if inner is not None and not closed:
+            close_resource(inner)
+
+
+class FoodieSession:
+    """State owned by one browser session"""
+
+    def __init__(self, token):
+        self.token = token
+        self.mongodb_agent = None
+        self.db_manager = None
+        self.conversation_history = []
+        self.total_recommendations = []
+        self.current_conversation_id = None
+        self.prompt_context = None
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        self.run_started_at = 0.0
+        self.run_finished_at = 0.0
+        self.rehydrated = False
+
+    def touch(self):
+        self.last_seen = time.time()
+
+    def idle_seconds(self):
+        return time.time() - self.last_seen
+
+    def begin_run(self):
+        """Mark the start of a script run using this session"""
+        self.run_started_at = self.last_seen = time.time()
+
+    def end_run(self):
+        """Mark the end of a script run; idle time counts from here"""
+        self.run_finished_at = self.last_seen = time.time()
+
+    def in_run(self, max_seconds=MAX_RUN_SECONDS):
+        """True while a script run is using this session"""
+        return (self.run_started_at > self.run_finished_at
+                and time.time() - self.run_started_at < max_seconds)
+
+    def memory_bytes(self):
+        """Estimated memory held by this session's own state"""
+        owned = [getattr(self, field) for field in PERSISTED_FIELDS]
+        # Agent and DB manager are measured shallowly so shared clients aren't counted per session
+        size = deep_sizeof(owned)
+        for shared in (self.mongodb_agent, self.db_manager):
+            if shared is not None:
+                size += deep_sizeof(shared, max_depth=2)
+        return size
+
+    def close(self):
+        """Release the non-persisted resources (agent, DB manager and their connections)"""
+        for field in ('mongodb_agent', 'db_manager'):
+            try:
+                close_resource(getattr(self, field))
+            except Exception as e:
+                print(f"Error closing {field} for session {self.token}: {e}")
+            setattr(self, field, None)
+
+
+class SessionRegistry:
+    """Keeps live sessions, spools idle ones to disk and rehydrates them on demand"""
+
+    def __init__(self, spool_dir, idle_timeout=1800, memory_limit_bytes=None,
+                 pressure_min_idle=60, spool_retention=7 * 24 * 3600, reap_interval=60):
+        self.spool_dir = spool_dir
+        self.idle_timeout = idle_timeout
+        self.memory_limit_bytes = memory_limit_bytes
+        self.pressure_min_idle = pressure_min_idle
+        self.spool_retention = spool_retention
+        self.reap_interval = reap_interval
+        self._sessions = {}
+        self._building = {}  # token -> lock held while that session is built
+        self._lock = threading.RLock()
+        self._reaper = None
+        self.evictions = 0
+        self.rehydrations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build the registry from the environment configuration"""
+        # SESSION_MEMORY_LIMIT_MB budgets the summed memory_bytes() of live sessions
+        limit_mb = float(os.getenv('SESSION_MEMORY_LIMIT_MB', '0'))
+        return cls(
+            spool_dir=os.getenv('SESSION_SPOOL_DIR', './session_spool'),
+            idle_timeout=float(os.getenv('SESSION_IDLE_TIMEOUT_MINUTES', '30')) * 60,
+            memory_limit_bytes=limit_mb * 1024 * 1024 if limit_mb > 0 else None,
+            reap_interval=float(os.getenv('SESSION_REAPER_INTERVAL_SECONDS', '60')),
+        )
+
+    def _spool_path(self, token):
+        return os.path.join(self.spool_dir, f"{token}.pkl")
+
+    def get_or_create(self, token, build):
+        """Return the live session for `token`, rehydrating or creating it as needed
+
+        `build(session)` attaches the non-persisted resources (agent, DB manager). It runs
+        outside the registry lock, so a slow connect only delays this token's reruns.
+        The session counts as in a run until `session.end_run()`, and is not evicted meanwhile.
+        """
+        self.start_reaper()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is not None:
+                session.begin_run()
+                return session
+            # Also waits for an eviction of this token that is still writing its spool file
+            token_lock = self._building.setdefault(token, threading.Lock())
+
+        with token_lock:
+            with self._lock:
+                session = self._sessions.get(token)
+            if session is None:
+                session = FoodieSession(token)
+                try:
+                    build(session)
+                    if self._restore(session):
+                        self.rehydrations += 1
+                    with self._lock:
+                        session.begin_run()
+                        self._sessions[token] = session
+                finally:
+                    with self._lock:
+                        self._building.pop(token, None)
+            else:
+                with self._lock:
+                    session.begin_run()
+            return session
+
+    def _restore(self, session):
+        """Load spooled state into a fresh session; returns True if anything was restored"""
+        path = self._spool_path(session.token)
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+            for field in PERSISTED_FIELDS:
+                if field in state:
+                    setattr(session, field, state[field])
+            session.rehydrated = True
+            os.remove(path)
+            return True
+        except Exception as e:
+            print(f"Error rehydrating session {session.token}: {e}")
+            return False
+
+    def evict(self, token, min_idle=None):
+        """Persist a session's state to the spool and release it
+
+        With `min_idle`, the session is only evicted if it is still idle that long when the
+        registry lock is taken; a session inside a script run is never evicted.
+        """
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None or session.in_run():
+                return False
+            if min_idle is not None and session.idle_seconds() < min_idle:
+                return False
+            del self._sessions[token]
+            # Hold the token's build lock until the spool is written, so a returning user
+            # rehydrates from it instead of starting empty
+            token_lock = self._building.setdefault(token, threading.Lock())
+            token_lock.acquire()
+        try:
+            session.close()
+            os.makedirs(self.spool_dir, exist_ok=True)
+            state = {field: getattr(session, field) for field in PERSISTED_FIELDS}
+            tmp_path = self._spool_path(token) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._spool_path(token))
+        except Exception as e:
+            print(f"Error persisting session {token}: {e}")
+        finally:
+            token_lock.release()
+            with self._lock:
+                # A returning user already holding it clears the entry after its build
+                if self._building.get(token) is token_lock and not token_lock.locked():
+                    self._building.pop(token)
+        self.evictions += 1
+        return True
+
+    def reap(self):
+        """Evict idle sessions, then LRU sessions while their summed memory is over the limit
+
+        The budget is the sessions' own accounted memory rather than process RSS: Python
+        rarely hands freed memory back to the OS, so RSS would stay over the limit and
+        every reap would evict every session past pressure_min_idle.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+
+        evicted = 0
+        for session in sessions:
+            if session.idle_seconds() >= self.idle_timeout:
+                # Re-checked under the lock: the user may have come back since the snapshot
+                evicted += self.evict(session.token, min_idle=self.idle_timeout)
+
+        if self.memory_limit_bytes:
+            with self._lock:
+                candidates = sorted(self._sessions.values(), key=lambda s: s.last_seen)
+            sizes = {session.token: session.memory_bytes() for session in candidates}
+            excess = sum(sizes.values()) - self.memory_limit_bytes
+            for session in candidates:
+                if excess <= 0:
+                    break
+                if session.idle_seconds() < self.pressure_min_idle:
+                    continue
+                if self.evict(session.token, min_idle=self.pressure_min_idle):
+                    excess -= sizes[session.token]
+                    evicted += 1
+
+        if evicted:
+            gc.collect()
+        self._expire_spool()
+        return evicted
+
+    def _expire_spool(self):
+        """Delete spooled sessions nobody came back for"""
+        if not os.path.isdir(self.spool_dir):
+            return
+        cutoff = time.time() - self.spool_retention
+        for name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def start_reaper(self):
+        """Start the background reaper thread once per process"""
+        if self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+
+            def loop():
+                while True:
+                    time.sleep(self.reap_interval)
+                    try:
+                        self.reap()
+                    except Exception as e:
+                        print(f"Session reaper error: {e}")
+
+            self._reaper = threading.Thread(target=loop, name='foodiebot-session-reaper', daemon=True)
+            self._reaper.start()
+
+    def stats(self):
+        """Per-session memory accounting and registry counters"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        rows = [
+            {
+                'session': session.token[:8],
+                'memory_kb': session.memory_bytes() / 1024,
+                'messages': len(session.conversation_history),
+                'idle_seconds': session.idle_seconds(),
+            }
+            for session in sessions
+        ]
+        spooled = 0
+        if os.path.isdir(self.spool_dir):
+            spooled = sum(1 for name in os.listdir(self.spool_dir) if name.endswith('.pkl'))
+        return {
+            'live_sessions': len(rows),
+            'session_bytes': sum(row['memory_kb'] for row in rows) * 1024,
+            'spooled_sessions': spooled,
+            'evictions': self.evictions,
+            'rehydrations': self.rehydrations,
+            'process_rss_bytes': process_rss_bytes(),
+            'sessions': rows,
+        }
+
+
+# Process-wide registry shared by every Streamlit session
+session_registry = SessionRegistry.from_env()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+🏪 FoodieBot Multi-Store Catalog
+Base catalog plus sparse per-store overrides (price, availability)
+
+Features:
+- One shared base catalog; stores only carry the fields they change
+- Each store's effective catalog is computed once and cached (LRU)
+- Store-scoped search, popular and related-product lookups over NumPy columns
+- Base-level category / dietary / text indexes shared by every store
+- Overrides from a JSON file (STORE_OVERRIDES_PATH) or a MongoDB collection
+  (STORE_OVERRIDES_COLLECTION) indexed by (store_id, product_id)
+
+Usage:
+  python -m src.store_catalog --benchmark [--stores 500] [--products 1000]
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.catalog_store import CatalogStore, ProductRecord, get_catalog_store
+
+DEFAULT_STORE_ID = 'default'
+
+
+class StoreProductRecord(ProductRecord):
+    """Catalog record as seen from one store (local price and availability)"""
+
+    __slots__ = ('_view',)
+
+    def __init__(self, view, index):
+        super().__init__(view.base, index)
+        self._view = view
+
+    def get(self, key, default=None):
+        if key == 'price':
+            return float(self._view.price[self._index])
+        if key == 'available':
+            return bool(self._view.available[self._index])
+        if key == 'store_id':
+            return self._view.store_id
+        return super().get(key, default)
+
+    def __getitem__(self, key):
+        if key in ('price', 'available', 'store_id'):
+            return self.get(key)
+        return super().__getitem__(key)
+
+    def to_dict(self):
+        product = super().to_dict()
+        product['price'] = self.get('price')
+        product['available'] = self.get('available')
+        product['store_id'] = self._view.store_id
+        return product
+
+
+class BaseIndexes:
+    """Store-independent lookup structures over the base catalog"""
+
+    def __init__(self, base):
+        # Snapshot the row count: columns can be longer than this while the catalog grows
+        self.size = len(base)
+        self.revision = base.revision
+        self.dietary = {}
+        for i, tags in enumerate(base.dietary_tags[:self.size]):
+            for tag in tags:
+                self.dietary.setdefault(tag, np.zeros(self.size, dtype=bool))[i] = True
+        self.search_text = np.array([
+            " ".join([base.product_id[i], base.name[i], base.description[i]] + list(base.ingredients[i])).lower()
+            for i in range(self.size)
+        ])
+        # Popularity order is the default sort for every store
+        self.by_popularity = np.argsort(-base.popularity_score[:self.size], kind='stable')
+
+    def dietary_mask(self, tags):
+        """Rows carrying any of the tags (the $in semantics of search_products)"""
+        mask = np.zeros(self.size, dtype=bool)
+        for tag in tags:
+            tag_mask = self.dietary.get(tag)
+            if tag_mask is not None:
+                mask |= tag_mask
+        return mask
+
+
+class StoreView:
+    """Effective catalog for one store; exposes the search API used by the app"""
+
+    def __init__(self, store_id, base, indexes, overrides):
+        self.store_id = store_id
+        self.base = base
+        self.indexes = indexes
+        self.price = base.price[:indexes.size].copy()
+        self.category_code = base.category_code[:indexes.size]
+        self.available = base.active[:indexes.size].copy()
+
+        for product_id, fields in (overrides or {}).items():
+            index = base.index_of(product_id)
+            if index is None or index >= indexes.size:
+                continue
+            if fields.get('price') is not None:
+                self.price[index] = fields['price']
+            if 'available' in fields:
+                # A store can't re-list a product that was deleted from the catalog
+                self.available[index] = bool(fields['available']) and base.active[index]
+
+        self._category_codes = sorted({int(c) for c in np.unique(self.category_code[self.available])})
+
+    def _record(self, index):
+        return StoreProductRecord(self, int(index))
+
+    def record(self, product_id):
+        """Store-scoped record for a product, or None if unknown or unavailable here"""
+        index = self.base.index_of(product_id)
+        # Products registered after this view was built are not part of it
+        if index is None or index >= len(self.available) or not self.available[index]:
+            return None
+        return self._record(index)
+
+    def records(self, product_ids):
+        """Store-scoped records for the IDs available in this store, in order"""
+        records = []
+        for product_id in product_ids:
+            record = self.record(product_id)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def search_products(self, category=None, dietary_tags=None, min_price=None, max_price=None,
+                        search_text=None, limit=20, **_):
+        """Store-scoped equivalent of MongoDBManager.search_products"""
+        mask = self.available.copy()
+        if category:
+            code = self.base.category_code_of(category)
+            if code is None:
+                return []
+            mask &= self.category_code == code
+        if dietary_tags:
+            mask &= self.indexes.dietary_mask(dietary_tags)
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if search_text:
+            mask &= np.char.find(self.indexes.search_text, search_text.lower()) >= 0
+
+        ordered = self.indexes.by_popularity[mask[self.indexes.by_popularity]]
+        if limit:
+            ordered = ordered[:limit]
+        return [self._record(i) for i in ordered]
+
+    def get_popular_products(self, limit=10):
+        """Most popular products available in this store"""
+        return self.search_products(limit=limit)
+
+    def get_categories(self):
+        """Categories with at least one product available in this store"""
+        return sorted(self.base.categories[c] for c in self._category_codes)
+
+    def get_products_count(self):
+        return int(self.available.sum())
+
+
+class StoreCatalog:
+    """Base catalog plus per-store overrides with a cache of effective catalogs"""
+
+    def __init__(self, base, overrides=None, cache_size=512):
+        self.base = base
+        self.overrides = overrides or {}
+        self.cache_size = cache_size
+        self._views = OrderedDict()
+        self._indexes = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, base=None):
+        """Build the store catalog from the environment configuration"""
+        base = base or get_catalog_store()
+        overrides = {}
+        path = os.getenv('STORE_OVERRIDES_PATH', '').strip()
+        if path:
+            try:
+                overrides = load_overrides_file(path)
+            except Exception as e:
+                print(f"Error loading store overrides: {e}")
+        catalog = cls(base, overrides, cache_size=int(os.getenv('STORE_CACHE_SIZE', '512')))
+
+        collection_name = os.getenv('STORE_OVERRIDES_COLLECTION', '').strip()
+        if collection_name:
+            try:
+                from database.connection import get_database
+                collection = get_database()[collection_name]
+                ensure_override_indexes(collection)
+                catalog.load_overrides_from_collection(collection)
+            except Exception as e:
+                print(f"Error loading store overrides from {collection_name}: {e}")
+        return catalog
+
+    def store_ids(self):
+        """Known store IDs, default first"""
+        return [DEFAULT_STORE_ID] + sorted(s for s in self.overrides if s != DEFAULT_STORE_ID)
+
+    def _base_indexes(self):
+        # The base catalog can grow (ensure) or change (refresh); rebuild shared indexes and views if so
+        if (self._indexes is None or self._indexes.size != len(self.base)
+                or self._indexes.revision != self.base.revision):
+            self._indexes = BaseIndexes(self.base)
+            self._views.clear()
+        return self._indexes
+
+    def view(self, store_id=DEFAULT_STORE_ID):
+        """Cached effective catalog for a store"""
+        with self._lock:
+            indexes = self._base_indexes()
+            view = self._views.get(store_id)
+            if view is not None:
+                self._views.move_to_end(store_id)
+                return view
+            view = StoreView(store_id, self.base, indexes, self.overrides.get(store_id))
+            self._views[store_id] = view
+            while len(self._views) > self.cache_size:
+                self._views.popitem(last=False)
+            return view
+
+    def set_override(self, store_id, product_id, **fields):
+        """Change one product's local fields and drop the store's cached view"""
+        with self._lock:
+            self.overrides.setdefault(store_id, {}).setdefault(product_id, {}).update(fields)
+            self._views.pop(store_id, None)
+
+    def load_overrides_from_collection(self, collection):
+        """Merge in the documents of a store_overrides collection (they win over the file)"""
+        overrides = {store_id: {pid: dict(fields) for pid, fields in products.items()}
+                     for store_id, products in self.overrides.items()}
+        for doc in collection.find({}, {'_id': 0}):
+            fields = {k: v for k, v in doc.items() if k not in ('store_id', 'product_id')}
+            overrides.setdefault(doc['store_id'], {}).setdefault(doc['product_id'], {}).update(fields)
+        with self._lock:
+            self.overrides = overrides
+            self._views.clear()
+
+
+def load_overrides_file(path):
+    """Read overrides shaped {store_id: {product_id: {price, available}}}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ensure_override_indexes(collection):
+    """Index a store_overrides collection for per-store loads and point lookups"""
+    collection.create_index([('store_id', 1), ('product_id', 1)], unique=True, name='store_product')
+
+
+_store_catalog = None
+_store_catalog_lock = threading.Lock()
+
+
+def get_store_catalog(base=None):
+    """Process-wide store catalog, built once on first use"""
+    global _store_catalog
+    if _store_catalog is None:
+        with _store_catalog_lock:
+            if _store_catalog is None:
+                _store_catalog = StoreCatalog.from_env(base)
+    return _store_catalog
+
+
+def benchmark(num_stores=500, num_products=1000, queries=2000, seed=7):
+    """Time view builds and store-scoped searches on a synthetic catalog"""
+    rng = random.Random(seed)
+    seed_products = CatalogStore.from_json()
+    products = []
+    for i in range(num_products):
+        template = seed_products.record(seed_products.product_id[i % len(seed_products)]).to_dict()
+        template['product_id'] = f"P{i:05d}"
+        template['price'] = round(rng.uniform(2, 25), 2)
+        template['popularity_score'] = rng.randint(1, 100)
+        products.append(template)
+    base = CatalogStore(products)
+
+    # Sparse overrides: ~10% of products differ per store
+    overrides = {}
+    for s in range(num_stores):
+        overrides[f"S{s:04d}"] = {
+            f"P{rng.randrange(num_products):05d}": {
+                'price': round(rng.uniform(2, 25), 2),
+                'available': rng.random() > 0.3,
+            }
+            for _ in range(num_products // 10)
+        }
+    catalog = StoreCatalog(base, overrides, cache_size=num_stores)
+
+    started = time.perf_counter()
+    for store_id in overrides:
+        catalog.view(store_id)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    categories = base.categories
+    started = time.perf_counter()
+    for _ in range(queries):
+        view = catalog.view(f"S{rng.randrange(num_stores):04d}")
+        view.search_products(category=rng.choice(categories), max_price=rng.uniform(5, 25), limit=8)
+    search_us = (time.perf_counter() - started) / queries * 1e6
+
+    print(f"🏪 {num_stores} stores × {num_products} products")
+    print(f"  Build all effective catalogs: {build_ms:.1f} ms ({build_ms / num_stores:.3f} ms/store)")
+    print(f"  Cached store-scoped search:   {search_us:.1f} µs/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-store catalog utilities")
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--stores', type=int, default=500)
+    parser.add_argument('--products', type=int, default=1000)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.stores, args.products)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+⌨️ FoodieBot Typeahead Index
+In-memory prefix index for Product Explorer search suggestions
+
+Features:
+- Sorted-array prefix lookups over product names, ingredients and tags
+- Fuzzy matches within edit distance 1 via a delete-neighbourhood index; multi-word
+  queries fall back to fuzzy-matching their last word
+- Suggestions ranked by match quality, then popularity_score; one- and two-letter
+  prefixes (the widest matches) keep their ranked rows cached
+- Built from the shared catalog and updated incrementally: catalog refreshes only
+  re-index the rows they changed, and removed products stay removed
+- Never touches the database
+
+Usage:
+  python -m src.typeahead --benchmark
+"""
+
+import argparse
+import bisect
+import re
+import threading
+import time
+
+from src.catalog_store import get_catalog_store
+
+MIN_FUZZY_LENGTH = 3
+MAX_FUZZY_PREFIX = 12
+# Queries up to this length keep their full ranking cached until the index changes
+MAX_CACHED_PREFIX = 2
+
+# Match quality bonuses, added to popularity_score (0-100)
+NAME_PREFIX_BONUS = 300
+WORD_PREFIX_BONUS = 200
+FUZZY_BONUS = 100
+
+_WORD_SPLIT = re.compile(r"[^\w']+")
+
+
+def _words(text):
+    return [w for w in _WORD_SPLIT.split(text.lower()) if w]
+
+
+def _deletes(text):
+    """All strings obtained by deleting one character"""
+    return {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+def within_one_edit(a, b):
+    """True if a and b differ by at most one insertion, deletion, substitution or transposition"""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    i = 0
+    while i < la and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        return a[i + 1:] == b[i + 1:] or (
+            i + 1 < la and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+        )
+    return a[i:] == b[i + 1:]
+
+
+class TypeaheadIndex:
+    """Prefix + fuzzy term index mapping search terms to catalog rows"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._terms = []          # sorted unique terms
+        self._postings = {}       # term -> {row: bonus}
+        self._fuzzy = {}          # prefix or one-delete-of-prefix -> {term}
+        self._row_terms = {}      # row -> {term}
+        self._removed = set()     # rows taken out with remove_product; sync skips them
+        self._ranked = {}         # short query -> [(score, row, term)], best first
+        self._indexed_rows = 0
+        self._revision = catalog.revision
+        self._lock = threading.Lock()
+        self.sync()
+
+    def _terms_for(self, row):
+        """Search terms for one catalog row with their match bonus"""
+        catalog = self.catalog
+        terms = {}
+        name = catalog.name[row].lower()
+        terms[name] = NAME_PREFIX_BONUS
+        for word in _words(name):
+            terms.setdefault(word, WORD_PREFIX_BONUS)
+        for text in catalog.ingredients[row] + catalog.dietary_tags[row] + catalog.mood_tags[row]:
+            text = text.lower()
+            terms.setdefault(text, 0)
+            for word in _words(text):
+                terms.setdefault(word, 0)
+        return terms
+
+    def _add_term(self, term):
+        index = bisect.bisect_left(self._terms, term)
+        self._terms.insert(index, term)
+        self._postings[term] = {}
+        for length in range(MIN_FUZZY_LENGTH - 1, min(len(term), MAX_FUZZY_PREFIX) + 1):
+            prefix = term[:length]
+            for variant in _deletes(prefix) | {prefix}:
+                self._fuzzy.setdefault(variant, set()).add(term)
+
+    def _drop_term(self, term):
+        index = bisect.bisect_left(self._terms, term)
+        if index < len(self._terms) and self._terms[index] == term:
+            del self._terms[index]
+        del self._postings[term]
+        for length in range(MIN_FUZZY_LENGTH - 1, min(len(term), MAX_FUZZY_PREFIX) + 1):
+            prefix = term[:length]
+            for variant in _deletes(prefix) | {prefix}:
+                bucket = self._fuzzy.get(variant)
+                if bucket is not None:
+                    bucket.discard(term)
+                    if not bucket:
+                        del self._fuzzy[variant]
+
+    def _index_row(self, row):
+        if row in self._removed or not self.catalog.active[row]:
+            return
+        terms = self._terms_for(row)
+        for term, bonus in terms.items():
+            if term not in self._postings:
+                self._add_term(term)
+            self._postings[term][row] = bonus
+        self._row_terms[row] = set(terms)
+        self._ranked.clear()
+
+    def _unindex_row(self, row):
+        for term in self._row_terms.pop(row, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(row, None)
+            if not postings:
+                self._drop_term(term)
+        self._ranked.clear()
+
+    def add_row(self, row):
+        """Index one catalog row (also undoes remove_product for it)"""
+        with self._lock:
+            self._removed.discard(row)
+            self._unindex_row(row)
+            self._index_row(row)
+
+    def add_product(self, product_id):
+        """Index a product by ID (e.g. after it was added to the catalog)"""
+        row = self.catalog.index_of(product_id)
+        if row is not None:
+            self.add_row(row)
+
+    def remove_product(self, product_id):
+        """Remove a product's terms from the index; later syncs leave it out"""
+        row = self.catalog.index_of(product_id)
+        if row is None:
+            return
+        with self._lock:
+            self._removed.add(row)
+            self._unindex_row(row)
+
+    def sync(self):
+        """Index rows appended to the catalog since the last sync and re-index rows a refresh changed"""
+        with self._lock:
+            revision = self.catalog.revision
+            if self._revision != revision:
+                changed = self.catalog.rows_changed_since(self._revision)
+                if changed is None:
+                    # Too far behind to know what changed; start over
+                    self._terms, self._postings, self._fuzzy, self._row_terms = [], {}, {}, {}
+                    self._ranked.clear()
+                    self._indexed_rows = 0
+                else:
+                    for row in changed:
+                        if row < self._indexed_rows:
+                            self._unindex_row(int(row))
+                            self._index_row(int(row))
+                self._revision = revision
+            total = len(self.catalog)
+            while self._indexed_rows < total:
+                self._index_row(self._indexed_rows)
+                self._indexed_rows += 1
+
+    def _prefix_terms(self, prefix):
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + '\uffff')
+        return self._terms[start:end]
+
+    def _fuzzy_terms(self, query):
+        """Terms with a prefix within one edit of the query"""
+        # Only prefixes up to MAX_FUZZY_PREFIX are indexed; longer queries look up their
+        # head (and the head minus one, for a dropped character) and verify in full below
+        key = query[:MAX_FUZZY_PREFIX]
+        keys = {key} if len(query) <= MAX_FUZZY_PREFIX else {key, key[:-1]}
+        candidates = set()
+        for key in keys:
+            for variant in _deletes(key) | {key}:
+                candidates |= self._fuzzy.get(variant, set())
+        matches = []
+        for term in candidates:
+            if any(within_one_edit(query, term[:length])
+                   for length in (len(query) - 1, len(query), len(query) + 1)
+                   if 0 < length <= len(term)):
+                matches.append(term)
+        return matches
+
+    def suggest(self, query, limit=8, available=None, fuzzy=True):
+        """Ranked suggestions: [{'product_id', 'name', 'term', 'fuzzy', 'score'}]
+
+        `available` is an optional boolean mask (e.g. a store's availability) over catalog rows.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        if self._indexed_rows < len(self.catalog) or self._revision != self.catalog.revision:
+            self.sync()
+
+        if len(query) <= MAX_CACHED_PREFIX:
+            return self._suggest_cached(query, limit, available)
+
+        scores = {}
+        matched = {}
+        with self._lock:
+            for term in self._prefix_terms(query):
+                for row, bonus in self._postings[term].items():
+                    if bonus >= scores.get(row, -1):
+                        scores[row], matched[row] = bonus, (term, False)
+            if fuzzy and len(query) >= MIN_FUZZY_LENGTH:
+                for term in self._fuzzy_terms(query):
+                    for row, bonus in self._postings[term].items():
+                        fuzzy_bonus = min(bonus, FUZZY_BONUS)
+                        if row not in scores:
+                            scores[row], matched[row] = fuzzy_bonus, (term, True)
+            words = _words(query)
+            if fuzzy and not scores and len(words) > 1 and len(words[-1]) >= MIN_FUZZY_LENGTH:
+                # Fuzzy-match the last word among rows whose terms match the earlier words
+                head_rows = None
+                for word in words[:-1]:
+                    rows = set()
+                    for term in self._prefix_terms(word):
+                        rows.update(self._postings[term])
+                    head_rows = rows if head_rows is None else head_rows & rows
+                for term in self._fuzzy_terms(words[-1]):
+                    for row, bonus in self._postings[term].items():
+                        if row in head_rows and row not in scores:
+                            scores[row], matched[row] = min(bonus, FUZZY_BONUS), (term, True)
+
+        popularity = self.catalog.popularity_score
+        ranked = sorted(
+            ((scores[row] + int(popularity[row]), row, matched[row][0], matched[row][1]) for row in scores),
+            reverse=True
+        )
+        return self._top(ranked, limit, available)
+
+    def _suggest_cached(self, query, limit, available):
+        """Prefix-only suggestions for one- and two-letter queries from the ranking cache"""
+        with self._lock:
+            ranked = self._ranked.get(query)
+            if ranked is None:
+                best = {}
+                for term in self._prefix_terms(query):
+                    for row, bonus in self._postings[term].items():
+                        if bonus >= best.get(row, (-1,))[0]:
+                            best[row] = (bonus, term)
+                popularity = self.catalog.popularity_score
+                ranked = sorted(
+                    ((bonus + int(popularity[row]), row, term, False) for row, (bonus, term) in best.items()),
+                    reverse=True
+                )
+                self._ranked[query] = ranked
+        return self._top(ranked, limit, available)
+
+    def _top(self, ranked, limit, available):
+        """First `limit` suggestions with distinct names from (score, row, term, fuzzy) tuples, best first"""
+        suggestions = []
+        seen_names = set()
+        for score, row, term, is_fuzzy in ranked:
+            if available is not None and (row >= len(available) or not available[row]):
+                continue
+            name = self.catalog.name[row]
+            if name in seen_names:
+                continue
+            seen_names.add(name)
+            suggestions.append({
+                'product_id': self.catalog.product_id[row],
+                'name': name,
+                'term': term,
+                'fuzzy': is_fuzzy,
+                'score': score,
+            })
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+
+_typeahead_index = None
+_typeahead_lock = threading.Lock()
+
+
+def get_typeahead_index(catalog=None):
+    """Process-wide typeahead index, built with the catalog on first use"""
+    global _typeahead_index
+    if _typeahead_index is None:
+        with _typeahead_lock:
+            if _typeahead_index is None:
+                _typeahead_index = TypeaheadIndex(catalog or get_catalog_store())
+    return _typeahead_index
+
+
+def benchmark(queries=('b', 'bu', 'bur', 'burg', 'chi', 'chick', 'chiken', 'spcy', 'vegetar', 'tac', 'mozarella')):
+    """Time index build and per-query suggestion latency"""
+    catalog = get_catalog_store()
+    started = time.perf_counter()
+    index = TypeaheadIndex(catalog)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"⌨️ Indexed {len(catalog)} products ({len(index._terms)} terms) in {build_ms:.1f} ms")
+
+    rounds = 200
+    for query in queries:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            suggestions = index.suggest(query)
+        per_query_us = (time.perf_counter() - started) / rounds * 1e6
+        top = suggestions[0]['name'] if suggestions else '-'
+        print(f"  {query!r:12} {per_query_us:7.1f} µs  {len(suggestions)} suggestions, top: {top}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Typeahead index utilities")
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from src.catalog_store import CatalogStore
+from src.meal_bundles import MealBundleEngine
+from src.store_catalog import StoreCatalog
+from src.typeahead import TypeaheadIndex
+
+
+def products():
+    catalog = CatalogStore.from_json()
+    return [catalog.record(pid).to_dict() for pid in catalog.product_id]
+
+
+def test_identical_refresh_keeps_the_revision():
+    items = products()
+    catalog = CatalogStore(items)
+    price = catalog.price
+
+    assert catalog.refresh(items) == (0, 0, 0)
+    assert catalog.revision == 0
+    assert catalog.price is price
+
+
+def test_refresh_swaps_only_changed_columns():
+    items = products()
+    catalog = CatalogStore(items)
+    name = catalog.name
+    items[3] = dict(items[3], price=items[3]['price'] + 1)
+
+    assert catalog.refresh(items) == (1, 0, 0)
+    assert catalog.revision == 1
+    assert catalog.price[3] == items[3]['price']
+    assert catalog.name is name
+
+
+def test_products_missing_from_a_refresh_become_inactive():
+    items = products()
+    catalog = CatalogStore(items)
+    gone = items[0]
+    assert catalog.refresh(items[1:]) == (0, 0, 1)
+    assert catalog.revision == 1
+    assert not catalog.active[0]
+
+    view = StoreCatalog(catalog).view()
+    assert view.record(gone['product_id']) is None
+    assert gone['product_id'] not in [r.product_id for r in view.search_products(limit=0)]
+    assert gone['product_id'] not in [r.product_id for r in catalog.popular(len(catalog))]
+    assert sum(catalog.category_counts().values()) == len(items) - 1
+
+    typeahead = TypeaheadIndex(catalog)
+    assert gone['product_id'] not in [s['product_id'] for s in typeahead.suggest(gone['name'], limit=50)]
+
+    engine = MealBundleEngine(catalog)
+    for bundle in engine.solve(budget=100, top_k=20):
+        assert gone['product_id'] not in [pid for _, pid in bundle['items']]
+
+    # Coming back to the collection re-lists it
+    assert catalog.refresh(items) == (1, 0, 0)
+    assert catalog.active[0]
+
+
+def test_truncated_refresh_does_not_deactivate():
+    items = products()
+    catalog = CatalogStore(items)
+    assert catalog.refresh(items[1:], complete=False) == (0, 0, 0)
+    assert catalog.active.all()
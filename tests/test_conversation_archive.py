@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from database.conversation_archive import LEGACY_ORDER_INDEX, ConversationArchive
+
+
+def message(i, when):
+    return {'sender': 'user', 'message': f"message {i}", 'timestamp': when, 'interest_score': i}
+
+
+@pytest.fixture(autouse=True)
+def bulk_replace_without_sort(monkeypatch):
+    """pymongo >= 4.10 passes sort= to bulk replaces, which mongomock 4.3 doesn't accept"""
+    builder = mongomock.collection.BulkOperationBuilder
+    add_replace = builder.add_replace
+    monkeypatch.setattr(builder, 'add_replace',
+                        lambda self, *args, sort=None, **kwargs: add_replace(self, *args, **kwargs))
+
+
+@pytest.fixture
+def archive():
+    archive = ConversationArchive(mongomock.MongoClient().db, bucket_size=3, archive_after_days=1)
+    archive.ensure_indexes()
+    return archive
+
+
+def test_message_appended_during_archiving_is_kept(archive):
+    old = datetime.now(timezone.utc) - timedelta(days=3)
+    for i in range(4):
+        archive.append_message('c1', message(i, old + timedelta(minutes=i)))
+
+    copy_to_archive = archive.archive.bulk_write
+
+    def append_while_copying(writes, **kwargs):
+        result = copy_to_archive(writes, **kwargs)
+        archive.append_message('c1', message(4, datetime.now(timezone.utc)))
+        return result
+
+    archive.archive.bulk_write = append_while_copying
+    archive.archive_cold()
+
+    assert [m['message'] for m in archive.get_messages('c1')] == [f"message {i}" for i in range(5)]
+    # The sealed bucket moved; the open one that got the new message stayed hot
+    assert archive.archive.count_documents({}) == 1
+    assert archive.hot.count_documents({}) == 1
+
+
+def test_append_after_archive_continues_bucket_numbers(archive):
+    old = datetime.now(timezone.utc) - timedelta(days=3)
+    for i in range(4):
+        archive.append_message('c1', message(i, old + timedelta(minutes=i)))
+    archive.archive_cold()
+    assert archive.hot.count_documents({}) == 0
+
+    assert archive.append_message('c1', message(4, datetime.now(timezone.utc))) == 1
+    assert [m['message'] for m in archive.get_messages('c1')] == [f"message {i}" for i in range(5)]
+
+
+def test_migrate_legacy_uses_the_order_index(archive):
+    legacy = archive.db['messages']
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    legacy.insert_many([dict(message(i, start + timedelta(minutes=i)), conversation_id='c1') for i in (4, 0, 2, 1, 3)])
+
+    assert archive.migrate_legacy(legacy) == 5
+    assert LEGACY_ORDER_INDEX in legacy.index_information()
+    assert [m['message'] for m in archive.get_messages('c1')] == [f"message {i}" for i in range(5)]
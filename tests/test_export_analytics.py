@@ -0,0 +1,91 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+pq = pytest.importorskip('pyarrow.parquet')
+ds = pytest.importorskip('pyarrow.dataset')
+mongomock = pytest.importorskip('mongomock')
+
+from export_analytics import export_collection, load_state
+
+
+def object_id_at(when):
+    """Unique ObjectId whose embedded creation time is `when`"""
+    return ObjectId(ObjectId.from_datetime(when).binary[:4] + os.urandom(8))
+
+
+def message(when, **fields):
+    return {'_id': object_id_at(when), 'timestamp': when, 'conversation_id': 'c1', **fields}
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def run(db, output_dir, run_id, full=False, lag_seconds=0, batch_size=2):
+    state = load_state(output_dir)
+    return export_collection(db, 'messages', 'timestamp', output_dir, state, batch_size, run_id,
+                             full=full, lag_seconds=lag_seconds)
+
+
+def read_back(output_dir):
+    path = os.path.join(output_dir, 'messages')
+    rows = pq.read_table(path).to_pylist()
+    assert ds.dataset(path, partitioning='hive').to_table().num_rows == len(rows)
+    return rows
+
+
+def test_type_change_rewrites_earlier_files(db, tmp_path):
+    output_dir = str(tmp_path)
+    day = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    db.messages.insert_many([message(day, interest_score=12.5), message(day + timedelta(days=1), interest_score=40)])
+    assert run(db, output_dir, 'run1') == 2
+
+    db.messages.insert_many([message(day + timedelta(days=2), interest_score='high', mood='happy')])
+    assert run(db, output_dir, 'run2') == 1
+
+    rows = read_back(output_dir)
+    assert sorted(row['interest_score'] for row in rows) == ['12.5', '40.0', 'high']
+    assert sorted(row['mood'] or '' for row in rows) == ['', '', 'happy']
+    assert load_state(output_dir)['messages']['schema']['interest_score'] == 'string'
+
+
+def test_null_only_column_gains_a_type(db, tmp_path):
+    output_dir = str(tmp_path)
+    day = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    db.messages.insert_many([message(day, rating=None)])
+    run(db, output_dir, 'run1')
+    db.messages.insert_many([message(day + timedelta(days=1), rating=4)])
+    run(db, output_dir, 'run2')
+
+    assert sorted(row['rating'] or 0 for row in read_back(output_dir)) == [0, 4.0]
+
+
+def test_incremental_runs_export_each_document_once(db, tmp_path):
+    output_dir = str(tmp_path)
+    day = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    db.messages.insert_many([message(day + timedelta(minutes=i), n=i) for i in range(5)])
+    assert run(db, output_dir, 'run1') == 5
+    assert run(db, output_dir, 'run2') == 0
+    db.messages.insert_many([message(day + timedelta(minutes=10), n=5)])
+    assert run(db, output_dir, 'run3') == 1
+    assert sorted(row['n'] for row in read_back(output_dir)) == [0, 1, 2, 3, 4, 5]
+
+    # --full replaces the output instead of adding to it
+    assert run(db, output_dir, 'run4', full=True) == 6
+    assert len(read_back(output_dir)) == 6
+
+
+def test_recent_documents_wait_for_the_safety_lag(db, tmp_path):
+    output_dir = str(tmp_path)
+    now = datetime.now(timezone.utc)
+    db.messages.insert_many([message(now - timedelta(minutes=10), n=1), message(now - timedelta(seconds=5), n=2)])
+
+    assert run(db, output_dir, 'run1', lag_seconds=60) == 1
+    # A replica's insert that lands just below the newest _id is still ahead of the mark
+    db.messages.insert_many([message(now - timedelta(seconds=6), n=3)])
+    assert run(db, output_dir, 'run2', lag_seconds=0) == 2
+    assert sorted(row['n'] for row in read_back(output_dir)) == [1, 2, 3]
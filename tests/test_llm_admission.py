@@ -0,0 +1,78 @@
+import threading
+import time
+
+from src.llm_admission import (
+    PRIORITY_IN_FLIGHT, PRIORITY_NEW_CONVERSATION, LLMAdmissionController, SQLiteTokenBucket, TokenBucket,
+    primary_provider,
+)
+
+
+def controller(capacity=1, per_second=20.0, deadline=2.0):
+    return LLMAdmissionController({
+        'gemini': TokenBucket('gemini', capacity, per_second),
+        'groq': TokenBucket('groq', capacity, per_second),
+    }, default_deadline=deadline, poll_interval=0.01)
+
+
+def test_bucket_refills_over_time():
+    bucket = TokenBucket('gemini', 2, 10.0)
+    assert bucket.try_acquire() == 0 and bucket.try_acquire() == 0
+    assert bucket.try_acquire() > 0
+    time.sleep(0.15)
+    assert bucket.try_acquire() == 0
+
+
+def test_only_the_given_providers_are_charged():
+    admission = controller()
+    assert admission.run(lambda: 'llm', lambda: 'fallback', providers=('gemini',)) == 'llm'
+    assert admission.buckets['gemini'].available() < 1
+    assert admission.buckets['groq'].available() == 1
+
+
+def test_fallback_when_the_deadline_cannot_be_met():
+    admission = controller(per_second=0.1)
+    assert admission.admit(['gemini'], deadline=0.5)
+    assert admission.run(lambda: 'llm', lambda: 'fallback', providers=('gemini',), deadline=0.5) == 'fallback'
+    assert admission.status()['fallbacks']['in_flight'] == 1
+
+
+def test_in_flight_conversations_are_admitted_first():
+    admission = controller(per_second=10.0)
+    assert admission.admit(['gemini'])  # drain the bucket
+    order = []
+
+    def request(priority, label):
+        if admission.admit(['gemini'], priority=priority):
+            order.append(label)
+
+    threads = [threading.Thread(target=request, args=(PRIORITY_NEW_CONVERSATION, 'new'))]
+    threads[0].start()
+    time.sleep(0.02)
+    threads.append(threading.Thread(target=request, args=(PRIORITY_IN_FLIGHT, 'in_flight')))
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+    assert order == ['in_flight', 'new']
+
+
+def test_slow_shared_bucket_does_not_block_status(tmp_path):
+    class SlowBucket(SQLiteTokenBucket):
+        def try_acquire(self, tokens=1):
+            time.sleep(0.3)  # a contended BEGIN IMMEDIATE
+            return super().try_acquire(tokens)
+
+    admission = LLMAdmissionController({'gemini': SlowBucket('gemini', 5, 1.0, str(tmp_path / 'rl.db'))})
+    thread = threading.Thread(target=admission.admit, args=(['gemini'],))
+    thread.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    assert admission.queue_depth() == 1
+    assert admission.status()['queue_depth'] == 1
+    assert time.monotonic() - started < 0.1
+    thread.join()
+
+
+def test_primary_provider_is_the_first_available():
+    assert primary_provider({'gemini_available': True, 'groq_available': True}) == ('gemini',)
+    assert primary_provider({'gemini_available': False, 'groq_available': True}) == ('groq',)
+    assert primary_provider({}) == ()
@@ -0,0 +1,75 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from src.catalog_store import CatalogStore
+from src.meal_bundles import DEFAULT_ROLE, OPTIONAL_ROLES, MealBundleEngine, synthetic_catalog
+
+
+def brute_force_scores(engine, budget, top_k, dietary=None, max_spice=None, required_roles=()):
+    """Scores of the top-K bundles by exhaustive enumeration"""
+    prices = engine.catalog.price
+    mains = engine.role_rows[DEFAULT_ROLE]
+    main_mask = engine._eligible(mains, DEFAULT_ROLE, dietary, max_spice, prices, None, budget)
+    candidates = {
+        role: np.flatnonzero(engine._eligible(engine.role_rows[role], role, dietary, max_spice,
+                                              prices, None, budget))
+        for role in OPTIONAL_ROLES
+    }
+    scores = []
+    for position in np.flatnonzero(main_mask):
+        main_row = mains[position]
+        choices = []
+        for role in OPTIONAL_ROLES:
+            rows = engine.role_rows[role][candidates[role]]
+            gains = engine.compatibility[role][position, candidates[role]] + engine.value[rows]
+            options = [(float(g), float(p)) for g, p in zip(gains, prices[rows])]
+            if role not in required_roles:
+                options.append((0.0, 0.0))
+            choices.append(options)
+        for combo in itertools.product(*choices):
+            if prices[main_row] + sum(p for _, p in combo) <= budget + 1e-9:
+                scores.append(float(engine.value[main_row]) + sum(g for g, _ in combo))
+    return sorted(scores, reverse=True)[:top_k]
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return MealBundleEngine(synthetic_catalog(100))
+
+
+@pytest.mark.parametrize('budget,top_k,dietary,max_spice,required', [
+    (budget, top_k, dietary, max_spice, required)
+    for budget in (8.0, 15.0, 30.0)
+    for top_k in (1, 5)
+    for dietary, max_spice in ((None, None), (['vegetarian'], 3))
+    for required in ((), ('drink',))
+])
+def test_solve_matches_brute_force(engine, budget, top_k, dietary, max_spice, required):
+    bundles = engine.solve(budget, top_k=top_k, dietary=dietary, max_spice=max_spice,
+                           required_roles=required, max_per_main=top_k)
+    expected = brute_force_scores(engine, budget, top_k, dietary, max_spice, required)
+    assert [b['score'] for b in bundles] == pytest.approx(expected, abs=1e-5)
+    for bundle in bundles:
+        assert bundle['total_price'] <= budget + 0.01
+
+
+def test_catalog_without_a_role():
+    products = [p for p in CatalogStore.from_json().records(CatalogStore.from_json().product_id)]
+    products = [p.to_dict() for p in products if p.get('category') != 'Beverages']
+    engine = MealBundleEngine(CatalogStore(products))
+    assert not len(engine.role_rows['drink'])
+    assert engine.solve(20.0, top_k=3)
+    assert engine.solve(20.0, required_roles=('drink',)) == []
+    engine.record_baskets([[products[0]['product_id'], products[-1]['product_id']]])
+
+
+def test_pair_counts_carry_over_rebuild():
+    catalog = synthetic_catalog(60)
+    engine = MealBundleEngine(catalog)
+    main = catalog.product_id[engine.role_rows[DEFAULT_ROLE][0]]
+    side = catalog.product_id[engine.role_rows['side'][0]]
+    engine.record_baskets([[main, side], [main, side]])
+    rebuilt = MealBundleEngine(catalog, engine.pair_counts)
+    assert rebuilt.co_counts['side'][0, 0] == 2
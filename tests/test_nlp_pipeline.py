@@ -0,0 +1,37 @@
+import pytest
+
+from src.nlp_pipeline import NLPPipeline
+
+
+def factors(text):
+    return {name for name, present in NLPPipeline()._analyze(text, use_libraries=False).factors.items() if present}
+
+
+@pytest.mark.parametrize('text, absent', [
+    ("Whatever you recommend is fine", {'rejection', 'question_asking'}),
+    ("What's on the border menu", {'order_intent'}),
+    ("Not that hungry", {'rejection'}),
+    ("I want something under $15", {'budget_concern'}),
+    ("Is the cheesecake shareable", {'specific_preferences'}),
+])
+def test_factors_match_whole_words(text, absent):
+    assert not factors(text) & absent
+
+
+@pytest.mark.parametrize('text, present', [
+    ("I hate onions", {'rejection'}),
+    ("Not that one.", {'rejection'}),
+    ("What's on the menu", {'question_asking'}),
+    ("I'll order the tacos", {'order_intent', 'specific_preferences'}),
+    ("That’s too pricey, I don’t like it", {'budget_concern', 'rejection'}),
+    ("Feeling indulgent and very spicy", {'mood_indication', 'specific_preferences'}),
+    ("I'm allergic to nuts, gluten-free please", {'dietary_conflict', 'dietary_restrictions'}),
+])
+def test_factors_still_detected(text, present):
+    assert present <= factors(text)
+
+
+def test_factors_are_read_only():
+    result = NLPPipeline()._analyze("I want a burger", use_libraries=False)
+    with pytest.raises(TypeError):
+        result.factors['order_intent'] = False
@@ -0,0 +1,32 @@
+import pytest
+
+from src.prompt_context import PromptContext, estimate_tokens
+
+
+@pytest.mark.parametrize('budget', [10, 50, 51, 120, 800])
+def test_render_stays_within_the_token_budget(budget):
+    context = PromptContext(token_budget=budget, summary_token_budget=budget // 2)
+    for i in range(30):
+        context.add_message('user', f"Turn {i}: I'd love a spicy vegetarian burger with extra cheese " * 3)
+        context.add_message('bot', f"Reply {i}: here are some great options for you today " * 3)
+        assert estimate_tokens(context.render()) <= budget
+        assert context.last_prompt_tokens() <= budget
+
+
+@pytest.mark.parametrize('message, budget', [
+    ("Something under $15 please", 15.0),
+    ("My budget is $12.50", 12.5),
+    ("Last week I paid $40 for a burger", None),
+    ("It was $9 and I loved it", None),
+])
+def test_budget_needs_a_qualifier(message, budget):
+    context = PromptContext()
+    context.add_message('user', message)
+    assert context.preferences['budget'] == budget
+
+
+def test_string_food_preferences_are_one_craving():
+    context = PromptContext()
+    context.add_message('user', "burgers", {'food_preferences': 'burger', 'dietary_preferences': 'vegan'})
+    assert context.preferences['cravings'] == ['burger']
+    assert context.preferences['dietary'] == ['vegan']
@@ -0,0 +1,34 @@
+from database.query_profiler import (
+    MONGO_SOURCE, STORE_VIEW_SOURCE, InMemoryProductCollection, QueryProfiler, advise, query_shape, summarize_log,
+)
+
+
+class FakeManager:
+    def search_products(self, **params):
+        return []
+
+
+def test_text_search_shape_names_every_matched_field():
+    assert query_shape({'search_text': 'burger'}).startswith('or(name,description,ingredients):regex')
+
+
+def test_store_view_calls_are_tagged_and_never_explained(tmp_path):
+    log_path = str(tmp_path / 'profile.jsonl')
+    collection = InMemoryProductCollection([{'category': 'Burgers', 'price': 9.0, 'popularity_score': 50}])
+    profiler = QueryProfiler(log_path=log_path, collection=collection, explain_every=1)
+    mongo = profiler.wrap(FakeManager())
+    store = profiler.wrap(FakeManager(), source=STORE_VIEW_SOURCE)
+
+    for _ in range(3):
+        mongo.search_products(category='Burgers')
+        store.search_products(max_price=10)
+    profiler._explain_queue.join()
+
+    # Only the mongo calls reached the collection, and only via the explain thread
+    assert len(collection.recorded) == 3
+    assert all(query == {'category': 'Burgers'} for query in collection.recorded)
+
+    rows = summarize_log(log_path)
+    assert {(row['source'], row['count']) for row in rows} == {(MONGO_SOURCE, 3), (STORE_VIEW_SOURCE, 3)}
+    assert [p['shape'] for p in advise(rows, collection)] == [query_shape({'category': 'Burgers'})]
+    assert {row['source'] for row in profiler.summary()} == {MONGO_SOURCE, STORE_VIEW_SOURCE}
@@ -0,0 +1,59 @@
+import time
+
+from src.session_registry import SessionRegistry
+
+
+class Closable:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def build(session):
+    session.mongodb_agent = Closable()
+    session.db_manager = Closable()
+
+
+def registry(tmp_path, **kwargs):
+    registry = SessionRegistry(str(tmp_path / 'spool'), reap_interval=3600, **kwargs)
+    registry._reaper = object()  # no background reaper in tests
+    return registry
+
+
+def test_session_in_a_run_is_not_evicted(tmp_path):
+    sessions = registry(tmp_path, idle_timeout=0)
+    session = sessions.get_or_create('t1', build)
+    assert session.in_run()
+    assert sessions.reap() == 0
+    assert session.mongodb_agent is not None
+
+    session.end_run()
+    assert sessions.reap() == 1
+    assert session.mongodb_agent is None
+
+
+def test_evict_rechecks_idleness(tmp_path):
+    sessions = registry(tmp_path, idle_timeout=60)
+    session = sessions.get_or_create('t1', build)
+    session.end_run()
+    session.last_seen = time.time() - 120
+    # The user came back between the reaper's snapshot and the eviction
+    sessions.get_or_create('t1', build).end_run()
+    assert not sessions.evict('t1', min_idle=60)
+    assert session.mongodb_agent is not None
+
+
+def test_evicted_session_rehydrates(tmp_path):
+    sessions = registry(tmp_path, idle_timeout=60)
+    session = sessions.get_or_create('t1', build)
+    session.conversation_history.append({'sender': 'user', 'message': 'hi'})
+    agent = session.mongodb_agent
+    session.end_run()
+
+    assert sessions.evict('t1')
+    assert agent.closed
+    restored = sessions.get_or_create('t1', build)
+    assert restored is not session and restored.rehydrated
+    assert restored.conversation_history == [{'sender': 'user', 'message': 'hi'}]
@@ -0,0 +1,86 @@
+import pytest
+
+from src.catalog_store import CatalogStore
+from src.typeahead import TypeaheadIndex, within_one_edit
+
+
+def products():
+    catalog = CatalogStore.from_json()
+    return [catalog.record(pid).to_dict() for pid in catalog.product_id]
+
+
+@pytest.fixture
+def catalog():
+    return CatalogStore(products())
+
+
+@pytest.mark.parametrize('a, b, expected', [
+    ('burger', 'burger', True),
+    ('burger', 'burgr', True),      # deletion
+    ('burgr', 'burger', True),      # insertion
+    ('burger', 'burgor', True),     # substitution
+    ('burger', 'bugrer', True),     # transposition
+    ('burger', 'bgurre', False),
+    ('burger', 'burg', False),
+    ('taco', 'tacos', True),
+    ('', 'a', True),
+    ('ab', 'ba', True),
+    ('abc', 'cab', False),
+])
+def test_within_one_edit(a, b, expected):
+    assert within_one_edit(a, b) is expected
+
+
+def names(suggestions):
+    return [s['name'] for s in suggestions]
+
+
+def test_long_query_with_a_late_typo(catalog):
+    suggestions = TypeaheadIndex(catalog).suggest('tex-mex fiesta burgr')
+    assert names(suggestions) == ['Tex-Mex Fiesta Burger']
+    assert suggestions[0]['fuzzy']
+
+
+def test_last_word_fuzzy_fallback_respects_earlier_words(catalog):
+    index = TypeaheadIndex(catalog)
+    suggestions = index.suggest('buffalo chiken')
+    assert suggestions and all('Buffalo' in name for name in names(suggestions))
+    assert index.suggest('zzzz chiken') == []
+
+
+def test_short_prefixes_match_the_uncached_ranking(catalog):
+    index = TypeaheadIndex(catalog)
+    for query in ('b', 'bu', 'c', 'ch'):
+        cached = index.suggest(query, limit=50)
+        index._ranked.clear()
+        assert cached == index.suggest(query, limit=50)
+        assert all(any(w.startswith(query) for t in index._row_terms[catalog.index_of(s['product_id'])]
+                       for w in t.split()) for s in cached)
+
+
+def test_removed_product_stays_removed_across_refreshes(catalog):
+    index = TypeaheadIndex(catalog)
+    items = products()
+    target = items[4]  # Buffalo Chicken Burger
+    index.remove_product(target['product_id'])
+    assert target['product_id'] not in [s['product_id'] for s in index.suggest('buffalo', limit=50)]
+
+    items[4] = dict(target, popularity_score=target['popularity_score'] + 1)
+    items[5] = dict(items[5], name='Zesty Zucchini Zinger')
+    assert catalog.refresh(items) == (2, 0, 0)
+    assert names(index.suggest('zesty')) == ['Zesty Zucchini Zinger']
+    assert target['product_id'] not in [s['product_id'] for s in index.suggest('buffalo', limit=50)]
+
+    index.add_product(target['product_id'])
+    assert target['product_id'] in [s['product_id'] for s in index.suggest('buffalo', limit=50)]
+
+
+def test_refresh_reindexes_only_changed_rows(catalog):
+    index = TypeaheadIndex(catalog)
+    items = products()
+    untouched = index._row_terms[10]
+    items[3] = dict(items[3], name='Mystery Meal')
+    catalog.refresh(items)
+    index.sync()
+    assert index._row_terms[10] is untouched
+    assert names(index.suggest('myst'))[0] == 'Mystery Meal'